@@ -0,0 +1,81 @@
+# cmrit_leaderboard/checkpoint.py
+
+import os
+import json
+import time
+
+from cmrit_leaderboard.config import Config, CHECKPOINT_DIR, CHECKPOINT_MAX_AGE_HOURS
+
+class Checkpoint:
+    """
+    Progress of one platform scrape, kept on disk as it goes.
+
+    Every finished student is appended as one JSON line to
+    <CHECKPOINT_DIR>/<USERS_COLLECTION>-<platform>.jsonl and flushed immediately, so a
+    restarted scrape picks up the stored results and only requests the students it is
+    missing. scrape_platform clears the checkpoint once the results are uploaded.
+    Checkpoints older than CHECKPOINT_MAX_AGE_HOURS are considered stale and dropped.
+    """
+    def __init__(self, platform):
+        os.makedirs(CHECKPOINT_DIR, exist_ok=True)
+        self.path = os.path.join(CHECKPOINT_DIR, f'{Config.USERS_COLLECTION}-{platform}.jsonl')
+        self.results = {}
+        complete = True
+
+        if os.path.exists(self.path):
+            age_hours = (time.time() - os.path.getmtime(self.path)) / 3600
+            if age_hours > CHECKPOINT_MAX_AGE_HOURS:
+                print(f"Discarding stale checkpoint {self.path} from {age_hours:.0f} hours ago")
+                os.remove(self.path)
+            else:
+                complete = self.load()
+                print(f"Resuming {platform} from {self.path} with {len(self.results)} students already done")
+
+        self.file = open(self.path, 'a')
+        if not complete:
+            # Start on a fresh line after a cut short one
+            self.file.write('\n')
+
+    def load(self):
+        """Read the stored results, return whether the file ends with a complete line."""
+        with open(self.path) as file:
+            text = file.read()
+        for line in text.splitlines():
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                # The last line may be cut short if the run was killed while writing it
+                continue
+            self.results[entry['hallTicketNo']] = entry['values']
+        return text == '' or text.endswith('\n')
+
+    def get(self, hall_ticket_no):
+        """Stored field values of a finished student, or None."""
+        return self.results.get(hall_ticket_no)
+
+    def save(self, hall_ticket_no, values):
+        self.results[hall_ticket_no] = values
+        self.file.write(json.dumps({'hallTicketNo': hall_ticket_no, 'values': values}, default=to_builtin) + '\n')
+        self.file.flush()
+
+    def close(self):
+        if not self.file.closed:
+            self.file.close()
+
+    def clear(self):
+        self.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
+def to_builtin(value):
+    # numpy scalars coming out of the DataFrame
+    if hasattr(value, 'item'):
+        return value.item()
+    raise TypeError(f"Cannot checkpoint {type(value).__name__}")
@@ -0,0 +1,114 @@
+# cmrit_leaderboard/codechef_pool.py
+
+import json
+import time
+import queue
+import threading
+import requests
+from concurrent.futures import ThreadPoolExecutor
+
+from cmrit_leaderboard.config import CODECHEF_CREDENTIALS, CODECHEF_OAUTH_URL, CODECHEF_TOKEN_REFRESH_SECONDS, RATE_LIMITS
+from cmrit_leaderboard.http_client import get_http_client
+from cmrit_leaderboard.rate_limiter import TokenBucket
+
+# How often the background thread looks for tokens due for renewal
+TOKEN_CHECK_SECONDS = 60
+
+class CodechefCredential:
+    """One CodeChef API client with its own access token and its own token bucket."""
+    def __init__(self, number, client_id, client_secret):
+        self.name = f'codechef #{number}'
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.limiter = TokenBucket(self.name, **RATE_LIMITS['codechef'])
+        self.access_token = None
+        self.fetched_at = 0
+
+    def refresh(self):
+        response = get_http_client('codechef').post(CODECHEF_OAUTH_URL,
+                             limiter=self.limiter,
+                             data={"grant_type": "client_credentials",
+                                   "scope": "public",
+                                   "client_id": f"{self.client_id}",
+                                   "client_secret": f"{self.client_secret}",
+                                   "redirect_uri": ""})
+        try:
+            self.access_token = response.json()["result"]["data"]["access_token"]
+        except (json.decoder.JSONDecodeError, KeyError):
+            print(f"Could not fetch an access token for {self.name}")
+            print("--" * 30)
+            print(response.text)
+            print("--" * 30)
+            raise
+        self.fetched_at = time.time()
+
+    def get(self, url, **kwargs):
+        return get_http_client('codechef').get(url,
+                             limiter=self.limiter,
+                             headers={"Authorization": f"Bearer {self.access_token}"},
+                             **kwargs)
+
+class CodechefTokenPool:
+    """
+    Spreads CodeChef API calls over every credential in CODECHEF_CREDENTIALS.
+
+    Each credential gets a token up front and a background thread renews it every
+    CODECHEF_TOKEN_REFRESH_SECONDS. `submit` runs a call on one worker per credential,
+    passing it an idle credential as the last argument, so every credential is paced
+    by its own token bucket and throughput grows with the number of credentials.
+    """
+    def __init__(self, credentials=CODECHEF_CREDENTIALS):
+        self.credentials = []
+        for number, (client_id, client_secret) in enumerate(credentials, start=1):
+            credential = CodechefCredential(number, client_id, client_secret)
+            try:
+                credential.refresh()
+            except (json.decoder.JSONDecodeError, KeyError, requests.RequestException) as e:
+                print(f"Skipping {credential.name}: {e.__class__.__name__} - {e}")
+                continue
+            self.credentials.append(credential)
+
+        if not self.credentials:
+            raise RuntimeError("No working CodeChef credentials")
+        print(f"Fetching CodeChef with {len(self.credentials)} of {len(credentials)} credentials")
+
+        self.idle = queue.Queue()
+        for credential in self.credentials:
+            self.idle.put(credential)
+        self.executor = ThreadPoolExecutor(len(self.credentials))
+        self.stopped = threading.Event()
+        threading.Thread(target=self.refresh_tokens, daemon=True).start()
+
+    def refresh_tokens(self):
+        while not self.stopped.wait(TOKEN_CHECK_SECONDS):
+            for credential in self.credentials:
+                if time.time() - credential.fetched_at < CODECHEF_TOKEN_REFRESH_SECONDS:
+                    continue
+                try:
+                    credential.refresh()
+                    print(f"Renewed the access token of {credential.name}")
+                except (json.decoder.JSONDecodeError, KeyError, requests.RequestException):
+                    # The old token is still valid for a while, try again on the next check
+                    pass
+
+    def submit(self, function, *args):
+        return self.executor.submit(self.call, function, *args)
+
+    def call(self, function, *args):
+        credential = self.idle.get()
+        try:
+            return function(*args, credential)
+        finally:
+            self.idle.put(credential)
+
+    def close(self):
+        self.stopped.set()
+        # Drop the queued calls when the caller bails out early
+        self.executor.shutdown(cancel_futures=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
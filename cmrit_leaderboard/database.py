@@ -1,19 +1,115 @@
 # cmrit_leaderboard/database.py
 
+import math
+import threading
 import pandas as pd
 
-from pymongo import MongoClient
-from cmrit_leaderboard.config import Config, MONGODB_URI
+from pymongo import MongoClient, UpdateOne
+from pymongo.errors import CollectionInvalid, OperationFailure
+from cmrit_leaderboard.config import Config, PLATFORMS, PLATFORM_RATING_FIELDS, MONGODB_URI, MONGODB_MAX_POOL_SIZE, UPLOAD_CHUNK_SIZE, EVALUATION_STATE_COLLECTION, HISTORY_COLLECTION_SUFFIX, HISTORY_RETENTION_DAYS, HISTORY_LOOKBACK_DAYS
+
+# One pooled client per process, shared by every Database instance
+_client = None
+# (db name, collection name) pairs whose indexes were already ensured by this process
+_indexed_collections = set()
+_client_lock = threading.Lock()
+
+def get_client():
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = MongoClient(MONGODB_URI, maxPoolSize=MONGODB_MAX_POOL_SIZE)
+    return _client
+
+STORAGE_BACKENDS = ['mongo', 'sqlite']
+
+def get_database():
+    """Return the storage backend selected for this run by Config.STORAGE_BACKEND."""
+    if Config.STORAGE_BACKEND == 'sqlite':
+        # Imported here to avoid a circular import, local_database builds on this module
+        from cmrit_leaderboard.local_database import LocalDatabase
+        return LocalDatabase()
+    return Database()
+
+class BaseDatabase:
+    """
+    Storage interface shared by every backend.
+
+    Users are documents keyed by hallTicketNo inside a per-batch collection.
+    Reads return iterables of plain dicts so they can be fed straight into pd.DataFrame.
+    """
+    # Whether evaluate_leaderboard(mode='aggregate') can run against this backend
+    SUPPORTS_AGGREGATION = False
+
+    def upsert_user(self, hall_ticket_no, data):
+        raise NotImplementedError
+
+    def upload_to_db_with_df(self, users: pd.DataFrame, collection=None, chunk_size=UPLOAD_CHUNK_SIZE, updated_at=None) -> dict:
+        raise NotImplementedError
+
+    def get_existing_users_for_platform(self, platform):
+        """Verified users of a platform, projected to platform_user_projection(platform)."""
+        raise NotImplementedError
+
+    def get_all_users(self, collection=None, fields=None):
+        """All users, or only `fields` of every user when given."""
+        raise NotImplementedError
+
+    def get_users_updated_since(self, timestamp, fields=None):
+        """Users whose updatedAt is strictly later than `timestamp`."""
+        raise NotImplementedError
+
+    def get_users_across_collections(self, collections, fields=None):
+        """Users of several collections read in one query, each tagged with its collection name as `cohort`."""
+        raise NotImplementedError
+
+    def get_evaluation_state(self):
+        """State saved by the last evaluation of the current collection, or None."""
+        raise NotImplementedError
+
+    def save_evaluation_state(self, state):
+        raise NotImplementedError
+
+    def append_rating_history(self, platform, users: pd.DataFrame) -> int:
+        """Append a point for every user whose platform ratings moved since their last point, return the number appended."""
+        raise NotImplementedError
+
+    def get_rating_history(self, hall_ticket_no, platform=None, start=None, end=None):
+        """Points of one user ordered by time, optionally limited to a platform and a [start, end] range."""
+        raise NotImplementedError
+
+class Database(BaseDatabase):
+    """MongoDB backend."""
+    SUPPORTS_AGGREGATION = True
 
-class Database:
     def __init__(self):
-        self.client = MongoClient(MONGODB_URI)
+        self.client = get_client()
         self.db = self.client[Config.DB_NAME]
-        self.users_collection = self.db[Config.USERS_COLLECTION]
-        self.users_collection.create_index(
+        self.users_collection = self.get_collection()
+        print(f"Connected to database: {Config.DB_NAME} - {Config.USERS_COLLECTION}")
+
+    def get_collection(self, collection=None):
+        # Default to the collection of the batch currently being processed
+        collection = self.db[collection or Config.USERS_COLLECTION]
+        self.ensure_indexes(collection)
+        return collection
+
+    def ensure_indexes(self, collection):
+        key = (collection.database.name, collection.name)
+        if key in _indexed_collections:
+            return
+        collection.create_index(
             [('hallTicketNo', 1)], unique=True
         )
-        print(f"Connected to database: {Config.DB_NAME} - {Config.USERS_COLLECTION}")
+        collection.create_index([('updatedAt', 1)])
+        # Partial indexes that cover get_existing_users_for_platform, holding only verified users
+        for platform in PLATFORMS:
+            collection.create_index(
+                [(f'{platform}Status', 1), (f'{platform}Username', 1)],
+                name=f'{platform}_verified_users',
+                partialFilterExpression={f'{platform}Status': True, f'{platform}Username': {'$exists': True}}
+            )
+        _indexed_collections.add(key)
 
     def upsert_user(self, hall_ticket_no, data):
         # Updated at
@@ -26,14 +122,191 @@ class Database:
 
     def get_existing_users_for_platform(self, platform):
         # Find users with {paltform}Username field and {paltform}Status True
-        return self.users_collection.find({f'{platform}Username': {'$exists': True, '$ne': None}, f'{platform}Status': True})
+        # Scrapers only need the hall ticket, the platform handle and the stored ratings
+        return self.users_collection.find(
+            {f'{platform}Username': {'$exists': True, '$ne': None}, f'{platform}Status': True},
+            platform_user_projection(platform)
+        )
+
+    def get_all_users(self, collection=None, fields=None):
+        return self.get_collection(collection).find({}, field_projection(fields))
+
+    def get_users_updated_since(self, timestamp, fields=None):
+        return self.users_collection.find({'updatedAt': {'$gt': timestamp}}, field_projection(fields))
+
+    def get_users_across_collections(self, collections, fields=None):
+        def cohort_stages(collection):
+            stages = [{'$project': field_projection(fields)}] if fields is not None else []
+            return stages + [{'$addFields': {'cohort': collection}}]
+
+        first, *others = collections
+        pipeline = cohort_stages(first)
+        for collection in others:
+            pipeline.append({'$unionWith': {'coll': collection, 'pipeline': cohort_stages(collection)}})
+        return self.aggregate(pipeline, first)
+
+    def get_evaluation_state(self):
+        return self.db[EVALUATION_STATE_COLLECTION].find_one({'_id': Config.USERS_COLLECTION}, {'_id': 0})
+
+    def save_evaluation_state(self, state):
+        self.db[EVALUATION_STATE_COLLECTION].replace_one({'_id': Config.USERS_COLLECTION}, state, upsert=True)
+
+    def get_history_collection(self):
+        name = Config.USERS_COLLECTION + HISTORY_COLLECTION_SUFFIX
+        key = (self.db.name, name)
+        if key not in _indexed_collections:
+            try:
+                self.db.create_collection(
+                    name,
+                    timeseries={'timeField': 'timestamp', 'metaField': 'meta', 'granularity': 'hours'},
+                    expireAfterSeconds=HISTORY_RETENTION_DAYS * 24 * 60 * 60
+                )
+            except CollectionInvalid:
+                pass  # Already exists
+            except OperationFailure as e:
+                # NamespaceExists, another scrape thread created it first
+                if e.code != 48:
+                    raise
+            self.db[name].create_index([('meta.hallTicketNo', 1), ('meta.platform', 1), ('timestamp', 1)])
+            _indexed_collections.add(key)
+        return self.db[name]
+
+    def append_rating_history(self, platform, users: pd.DataFrame) -> int:
+        history = self.get_history_collection()
+        since = pd.Timestamp.now() - pd.Timedelta(days=HISTORY_LOOKBACK_DAYS)
+        last_points = {
+            point['_id']: point['last']
+            for point in history.aggregate([
+                {'$match': {'meta.platform': platform, 'timestamp': {'$gte': since}}},
+                {'$sort': {'meta.hallTicketNo': 1, 'meta.platform': 1, 'timestamp': 1}},
+                {'$group': {'_id': '$meta.hallTicketNo', 'last': {'$last': '$$ROOT'}}},
+            ])
+        }
+
+        timestamp = pd.Timestamp.now()
+        points = [
+            {'timestamp': timestamp, 'meta': {'hallTicketNo': hall_ticket_no, 'platform': platform}, **ratings}
+            for hall_ticket_no, ratings in rating_history_points(platform, users, last_points)
+        ]
+        if points:
+            history.insert_many(points, ordered=False)
+
+        print(f"Appended {len(points)} {platform} rating history points to {history.name}")
+        return len(points)
+
+    def get_rating_history(self, hall_ticket_no, platform=None, start=None, end=None):
+        query = {'meta.hallTicketNo': hall_ticket_no}
+        if platform:
+            query['meta.platform'] = platform
+        if start is not None or end is not None:
+            query['timestamp'] = {}
+            if start is not None:
+                query['timestamp']['$gte'] = start
+            if end is not None:
+                query['timestamp']['$lte'] = end
+        return list(self.get_history_collection().find(query, {'_id': 0}).sort('timestamp', 1))
+
+    def aggregate(self, pipeline, collection=None):
+        return list(self.get_collection(collection).aggregate(pipeline))
+
+    def upload_to_db_with_df(self, users: pd.DataFrame, collection=None, chunk_size=UPLOAD_CHUNK_SIZE, updated_at=None) -> dict:
+        """
+        Upsert every row of the dataframe keyed by hallTicketNo.
+
+        Each chunk of `chunk_size` rows is compared against the stored documents and
+        only the fields that actually changed are sent, as one unordered bulk write.
+        Rows with no changes are skipped and keep their previous updatedAt, changed rows
+        get `updated_at` (now by default).
+        Returns the matched/modified/upserted/skipped counts summed over all chunks.
+        """
+        users_collection = self.get_collection(collection)
+        updated_at = updated_at or pd.Timestamp.now()
+        counts = {'matched': 0, 'modified': 0, 'upserted': 0, 'skipped': 0}
+
+        records = users.to_dict('records')
+        for start in range(0, len(records), chunk_size):
+            chunk = records[start:start + chunk_size]
+            fields = {field for data in chunk for field in data} - {'_id', 'updatedAt'}
+            existing = {
+                user['hallTicketNo']: user
+                for user in users_collection.find(
+                    {'hallTicketNo': {'$in': [data.get('hallTicketNo') for data in chunk]}},
+                    {field: 1 for field in fields}
+                )
+            }
+
+            operations = []
+            for data in chunk:
+                hall_ticket_no = data.pop('hallTicketNo', None)
+                # _id is immutable and the documents are keyed by hallTicketNo anyway
+                data.pop('_id', None)
+                data.pop('updatedAt', None)
+
+                changes = changed_fields(data, existing.get(hall_ticket_no))
+                if hall_ticket_no in existing and not changes:
+                    counts['skipped'] += 1
+                    continue
+
+                changes['updatedAt'] = updated_at
+                operations.append(UpdateOne({'hallTicketNo': hall_ticket_no}, {'$set': changes}, upsert=True))
+
+            if not operations:
+                continue
+
+            result = users_collection.bulk_write(operations, ordered=False)
+            counts['matched'] += result.matched_count
+            counts['modified'] += result.modified_count
+            counts['upserted'] += result.upserted_count
+
+        print_upload_summary(users_collection.name, len(records), counts)
+        return counts
+
+def field_projection(fields):
+    if fields is None:
+        return None
+    return {'_id': 0, **{field: 1 for field in fields}}
+
+def platform_user_projection(platform):
+    # The stored ratings come along so users a scrape cannot resolve keep them
+    return {'_id': 0, 'hallTicketNo': 1, f'{platform}Username': 1, **{field: 1 for field in PLATFORM_RATING_FIELDS[platform]}}
+
+def rating_history_points(platform, users: pd.DataFrame, last_points):
+    """
+    Yield (hallTicketNo, ratings) for every user whose platform ratings differ from
+    their last recorded point in `last_points`. Unchanged series get no new point.
+    """
+    fields = [field for field in PLATFORM_RATING_FIELDS[platform] if field in users.columns]
+    if not fields:
+        return
+    for user in users[['hallTicketNo'] + fields].to_dict('records'):
+        hall_ticket_no = user.pop('hallTicketNo')
+        ratings = {field: value for field, value in user.items() if not is_missing(value)}
+        if not ratings:
+            continue
+        last = last_points.get(hall_ticket_no)
+        if last is not None and not changed_fields(ratings, last):
+            continue
+        yield hall_ticket_no, ratings
+
+def print_upload_summary(collection, total, counts):
+    print(f"Uploaded {total} users to {collection}: "
+          f"{counts['matched']} matched, {counts['modified']} modified, {counts['upserted']} upserted, "
+          f"{counts['skipped']} unchanged writes skipped")
+
+def is_missing(value):
+    return value is None or (isinstance(value, float) and math.isnan(value))
 
-    def get_all_users(self):
-        return self.users_collection.find({})
-    
-    def upload_to_db_with_df(self, users: pd.DataFrame) -> None:
-        for index, row in users.iterrows():
-            data = row.to_dict()
-            data.pop('hallTicketNo', None)
-            self.upsert_user(row['hallTicketNo'], data)
+def changed_fields(data, stored):
+    """Return the subset of `data` that differs from the stored document (None means a new user)."""
+    if stored is None:
+        return dict(data)
 
+    changes = {}
+    for field, value in data.items():
+        stored_value = stored.get(field)
+        # Missing, None and NaN all read back as NaN in pandas, so they are not a change
+        if is_missing(value) and is_missing(stored_value):
+            continue
+        if is_missing(value) != is_missing(stored_value) or value != stored_value:
+            changes[field] = value
+    return changes
@@ -1,12 +1,12 @@
 import os
 import pandas as pd
-from cmrit_leaderboard.database import Database
+from cmrit_leaderboard.database import get_database
 from cmrit_leaderboard.config import Config, CODECHEF_FILE, CODEFORCES_FILE, GEEKSFORGEEKS_FILE, HACKERRANK_FILE, LEETCODE_FILE
 from verifiers.participant import Participant
 
 def upload_to_db(is_test=False, test_participants: list[Participant] = None):
     # Moved this line here to avoid pusing to same database multiple times when running for multiple batches
-    db = Database() 
+    db = get_database()
 
     if is_test:
         # Initialize df with columns
@@ -1,101 +1,201 @@
+import numpy as np
 import pandas as pd
 
-from cmrit_leaderboard.database import Database
-
-def evaluate_leaderboard():
-    db = Database()
-    users = db.get_all_users()
-
-    users = pd.DataFrame(users)
-
-    users.fillna(0, inplace=True)
+from cmrit_leaderboard.config import Config
+from cmrit_leaderboard.database import get_database
+
+EVALUATION_MODES = ['pandas', 'aggregate', 'incremental']
+
+# Rating fields summed into TotalRating, with their weight in the max-normalized Percentile.
+# The order matters: it is the order the terms are added in, which keeps both modes bit-for-bit equal.
+PERCENTILE_WEIGHTS = {
+    'codechefRating': 0.1,
+    'codeforcesRating': 0.2,
+    'geeksforgeeksWeeklyRating': 0.2,
+    'geeksforgeeksPracticeRating': 0.1,
+    'leetcodeRating': 0.1,
+    'hackerrankRating': 0.1,
+    'pyramidWeeklyRating': 0.1,
+    'pyramidMonthlyRating': 0.1,
+}
+
+def evaluate_leaderboard(mode='pandas'):
+    db = get_database()
+    # Written as updatedAt on every changed user and saved as the evaluation time, so the next
+    # incremental run only picks up users that were written after this evaluation started
+    evaluated_at = pd.Timestamp.now()
+
+    if mode == 'aggregate' and not db.SUPPORTS_AGGREGATION:
+        print(f"The {Config.STORAGE_BACKEND} storage backend has no aggregation pipeline, evaluating in pandas instead")
+        mode = 'pandas'
+
+    if mode == 'aggregate':
+        maxima = evaluate_leaderboard_in_database(db, evaluated_at)
+    elif mode == 'incremental':
+        maxima = evaluate_changed_users(db, evaluated_at)
+    else:
+        maxima = evaluate_all_users(db, evaluated_at)
+
+    db.save_evaluation_state({'evaluatedAt': evaluated_at, 'maxima': maxima})
+
+def evaluate_all_users(db, evaluated_at):
+    users = pd.DataFrame(db.get_all_users(fields=['hallTicketNo'] + list(PERCENTILE_WEIGHTS)))
 
     print("Users loaded:", len(users))
 
-    users['TotalRating'] = users.get('codechefRating', 0) + users.get('codeforcesRating', 0) + users.get('geeksforgeeksWeeklyRating', 0) + users.get('geeksforgeeksPracticeRating', 0) + users.get('leetcodeRating', 0) + users.get('hackerrankRating', 0) + users.get('pyramidWeeklyRating', 0) + users.get('pyramidMonthlyRating', 0)
-
-    print("TotalRating column added")
-
-    try:
-        max_codechef_rating = users.loc[users['codechefRating'].notnull(), 'codechefRating'].max()
-    except KeyError:
-        max_codechef_rating = 0
-
-    print("Max codechef rating:", max_codechef_rating)
-
-    try:
-        max_codeforces_rating = users.loc[users['codeforcesRating'].notnull(), 'codeforcesRating'].max()
-    except KeyError:
-        max_codeforces_rating = 0
-
-    print("Max codeforces rating:", max_codeforces_rating)
-
-    try:
-        max_geeksforgeeks_weekly_rating = users.loc[users['geeksforgeeksWeeklyRating'].notnull(), 'geeksforgeeksWeeklyRating'].max()
-    except KeyError:
-        max_geeksforgeeks_weekly_rating = 0
-
-    print("Max geeksforgeeks weekly rating:", max_geeksforgeeks_weekly_rating)
-
-    try:
-        max_geeksforgeeks_practice_rating = users.loc[users['geeksforgeeksPracticeRating'].notnull(), 'geeksforgeeksPracticeRating'].max()
-    except KeyError:
-        max_geeksforgeeks_practice_rating = 0
-
-    print("Max geeksforgeeks practice rating:", max_geeksforgeeks_practice_rating)
-
-    try:
-        max_leetcode_rating = users.loc[users['leetcodeRating'].notnull(), 'leetcodeRating'].max()
-    except KeyError:
-        max_leetcode_rating = 0
-
-    print("Max leetcode rating:", max_leetcode_rating)
-
-    try:
-        max_hackerrank_rating = users.loc[users['hackerrankRating'].notnull(), 'hackerrankRating'].max()
-    except KeyError:
-        max_hackerrank_rating = 0
-
-    print("Max hackerrank rating:", max_hackerrank_rating)
-
-    try:
-        max_pyramid_weekly_rating = users.loc[users['pyramidWeeklyRating'].notnull(), 'pyramidWeeklyRating'].max()
-    except KeyError:
-        max_pyramid_weekly_rating = 0
-
-    print("Max pyramid weekly rating:", max_pyramid_weekly_rating)
-
-    try:
-        max_pyramid_monthly_rating = users.loc[users['pyramidMonthlyRating'].notnull(), 'pyramidMonthlyRating'].max()
-    except KeyError:
-        max_pyramid_monthly_rating = 0
-
-    print("Max pyramid monthly rating:", max_pyramid_monthly_rating)
-
-    for index, row in users.iterrows():
-        cc = float(row.get('codechefRating', 0))
-        cc = cc / max_codechef_rating * 100 if max_codechef_rating != 0 else 0
-        cf = float(row.get('codeforcesRating', 0))
-        cf = cf / max_codeforces_rating * 100 if max_codeforces_rating != 0 else 0
-        ggw = float(row.get('geeksforgeeksWeeklyRating', 0))
-        ggw = ggw / max_geeksforgeeks_weekly_rating * 100 if max_geeksforgeeks_weekly_rating != 0 else 0
-        ggp = float(row.get('geeksforgeeksPracticeRating', 0))
-        ggp = ggp / max_geeksforgeeks_practice_rating * 100 if max_geeksforgeeks_practice_rating != 0 else 0
-        lc = float(row.get('leetcodeRating', 0))
-        lc = lc / max_leetcode_rating * 100 if max_leetcode_rating != 0 else 0
-        hr = float(row.get('hackerrankRating', 0))
-        hr = hr / max_hackerrank_rating * 100 if max_hackerrank_rating != 0 else 0
-        pw = float(row.get('pyramidWeeklyRating', 0))
-        pw = pw / max_pyramid_weekly_rating * 100 if max_pyramid_weekly_rating != 0 else 0
-        pm = float(row.get('pyramidMonthlyRating', 0))
-        pm = pm / max_pyramid_monthly_rating * 100 if max_pyramid_monthly_rating != 0 else 0
-
-        percentile = cc * 0.1 + cf * 0.2 + ggw * 0.2 + ggp * 0.1 + lc * 0.1 + hr * 0.1 + pw * 0.1 + pm * 0.1
-
-        users.at[index, 'Percentile'] = percentile
-
-    users.replace({' ': ''}, regex=True, inplace=True)
-
-    print("Percentile column added")
-
-    db.upload_to_db_with_df(users)
\ No newline at end of file
+    ratings = rating_matrix(users)
+    maxima = rating_maxima(ratings)
+    print_maxima(maxima)
+
+    upload_scores(db, users, ratings, maxima, evaluated_at)
+    return maxima
+
+def evaluate_changed_users(db, evaluated_at):
+    """
+    Re-score only the users written since the last evaluation.
+
+    A Percentile only depends on the user's own ratings and the per-field maxima, so when
+    the maxima are the ones the last evaluation normalized with, every other user's score
+    is still valid. When a maximum moved, or there is no previous evaluation, every user
+    is re-scored instead.
+    """
+    state = db.get_evaluation_state()
+    maxima = get_rating_maxima(db)
+    print_maxima(maxima)
+
+    if state is None or state['maxima'] != maxima:
+        print("No previous evaluation or a maximum rating moved, evaluating all users")
+        return evaluate_all_users(db, evaluated_at)
+
+    users = pd.DataFrame(db.get_users_updated_since(state['evaluatedAt'], fields=['hallTicketNo'] + list(PERCENTILE_WEIGHTS)))
+    print(f"Users changed since the last evaluation at {state['evaluatedAt']}:", len(users))
+
+    if len(users) > 0:
+        upload_scores(db, users, rating_matrix(users), maxima, evaluated_at)
+    return maxima
+
+def print_maxima(maxima):
+    for field, maximum in maxima.items():
+        print(f"Max {field}:", maximum)
+
+def upload_scores(db, users, ratings, maxima, evaluated_at):
+    users['TotalRating'], users['Percentile'] = score_ratings(ratings, maxima)
+
+    print("TotalRating and Percentile columns added")
+
+    # Write back the filled ratings and the scores only, the rest of the document is untouched
+    fields = [field for field in PERCENTILE_WEIGHTS if field in users.columns]
+    users[fields] = ratings[:, [list(PERCENTILE_WEIGHTS).index(field) for field in fields]]
+    db.upload_to_db_with_df(users[['hallTicketNo'] + fields + ['TotalRating', 'Percentile']], updated_at=evaluated_at)
+
+def rating_matrix(users: pd.DataFrame) -> np.ndarray:
+    """
+    Float matrix of the PERCENTILE_WEIGHTS rating fields, one row per user and one column per field.
+    Missing columns, missing values and non-numeric values count as 0.
+    """
+    ratings = users.reindex(columns=list(PERCENTILE_WEIGHTS))
+    ratings = ratings.apply(pd.to_numeric, errors='coerce')
+    return ratings.fillna(0).to_numpy(dtype=np.float64)
+
+def rating_maxima(ratings: np.ndarray) -> dict:
+    if len(ratings) == 0:
+        return {field: 0.0 for field in PERCENTILE_WEIGHTS}
+    return dict(zip(PERCENTILE_WEIGHTS, ratings.max(axis=0).tolist()))
+
+def score_ratings(ratings: np.ndarray, maxima: dict):
+    """
+    Return the (TotalRating, Percentile) arrays for a rating matrix.
+
+    Percentile is the weighted sum of every rating normalized to its field maximum (as a
+    percentage). The columns are accumulated one at a time, in PERCENTILE_WEIGHTS order,
+    so the floating point result is identical to the aggregation pipeline.
+    """
+    total_rating = np.zeros(len(ratings))
+    percentile = np.zeros(len(ratings))
+    for column, (field, weight) in enumerate(PERCENTILE_WEIGHTS.items()):
+        total_rating = total_rating + ratings[:, column]
+        if maxima[field] != 0:
+            percentile = percentile + ratings[:, column] / maxima[field] * 100 * weight
+    return total_rating, percentile
+
+def rating_expression(field):
+    """Aggregation expression for a rating that treats missing, null and NaN as 0, like fillna(0)."""
+    return {
+        '$let': {
+            'vars': {'rating': {'$ifNull': [f'${field}', 0]}},
+            'in': {'$cond': [{'$eq': ['$$rating', float('nan')]}, 0, '$$rating']}
+        }
+    }
+
+def sum_expression(terms):
+    """Left-to-right chain of binary $add, so the server adds in the same order as pandas."""
+    expression = terms[0]
+    for term in terms[1:]:
+        expression = {'$add': [expression, term]}
+    return expression
+
+def get_rating_maxima(db):
+    """Per-field maxima, computed on the server when the backend has an aggregation pipeline."""
+    if not db.SUPPORTS_AGGREGATION:
+        return rating_maxima(rating_matrix(pd.DataFrame(db.get_all_users(fields=list(PERCENTILE_WEIGHTS)))))
+
+    group = {'_id': None}
+    for field in PERCENTILE_WEIGHTS:
+        group[field] = {'$max': rating_expression(field)}
+
+    # A single small document comes back
+    result = db.aggregate([{'$group': group}])
+    if not result:
+        return {field: 0.0 for field in PERCENTILE_WEIGHTS}
+    return {field: float(result[0].get(field) or 0) for field in PERCENTILE_WEIGHTS}
+
+def build_evaluation_pipeline(maxima, collection, updated_at):
+    total_rating = sum_expression([rating_expression(field) for field in PERCENTILE_WEIGHTS])
+
+    percentile_terms = []
+    for field, weight in PERCENTILE_WEIGHTS.items():
+        if maxima[field] != 0:
+            normalized = {'$multiply': [{'$divide': [rating_expression(field), maxima[field]]}, 100]}
+        else:
+            normalized = 0
+        percentile_terms.append({'$multiply': [normalized, weight]})
+
+    return [
+        {'$project': {
+            'TotalRating': total_rating,
+            'Percentile': sum_expression(percentile_terms),
+        }},
+        {'$merge': {
+            'into': collection,
+            'on': '_id',
+            # Only bump updatedAt for users whose score actually moved
+            'whenMatched': [{'$set': {
+                'updatedAt': {'$cond': [
+                    {'$and': [
+                        {'$eq': ['$TotalRating', '$$new.TotalRating']},
+                        {'$eq': ['$Percentile', '$$new.Percentile']},
+                    ]},
+                    '$updatedAt',
+                    updated_at,
+                ]},
+                'TotalRating': '$$new.TotalRating',
+                'Percentile': '$$new.Percentile',
+            }}],
+            'whenNotMatched': 'discard',
+        }},
+    ]
+
+def evaluate_leaderboard_in_database(db, evaluated_at):
+    """
+    Compute TotalRating and Percentile inside MongoDB.
+
+    The maxima come back from a $group, then a $project/$merge pipeline writes
+    both fields onto every user document without the documents leaving the server.
+    """
+    maxima = get_rating_maxima(db)
+    print_maxima(maxima)
+
+    db.aggregate(build_evaluation_pipeline(maxima, Config.USERS_COLLECTION, evaluated_at))
+
+    print("TotalRating and Percentile merged in the database")
+    return maxima
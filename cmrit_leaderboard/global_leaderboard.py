@@ -0,0 +1,67 @@
+# cmrit_leaderboard/global_leaderboard.py
+
+import pandas as pd
+
+from cmrit_leaderboard.config import Config, DB_MAPPING, PLATFORMS
+from cmrit_leaderboard.database import get_database
+from cmrit_leaderboard.evaluator import PERCENTILE_WEIGHTS, rating_matrix, rating_maxima, score_ratings
+
+GLOBAL_LEADERBOARD_COLUMNS = {
+    'cohort': 'Cohort',
+    'hallTicketNo': 'Hall Ticket No',
+    'TotalRating': 'Total Rating',
+    'Percentile': 'Percentile',
+    'CohortRank': 'Cohort Rank',
+    'GlobalPercentile': 'Global Percentile',
+    'GlobalRank': 'Global Rank',
+}
+
+def build_global_leaderboard():
+    """
+    Rank every configured cohort together.
+
+    All collections of a database are read in one combined query. The cohort Percentile is
+    normalized to the cohort's own maxima, exactly like --evaluate, and the global Percentile
+    to the maxima across all cohorts. Both ranks end up in one <DB_NAME>-GLOBAL-LEADERBOARD.xlsx.
+    """
+    cohorts_by_db = {}
+    for batch_config in DB_MAPPING.values():
+        cohorts_by_db.setdefault(batch_config["DB_NAME"], []).append(batch_config["USERS_COLLECTION"])
+
+    for db_name, collections in cohorts_by_db.items():
+        Config.DB_NAME = db_name
+        Config.USERS_COLLECTION = collections[0]
+        db = get_database()
+
+        fields = ['hallTicketNo'] + [f'{platform}Username' for platform in PLATFORMS] + list(PERCENTILE_WEIGHTS)
+        users = pd.DataFrame(db.get_users_across_collections(collections, fields=fields))
+        print(f"Users loaded across {len(collections)} cohorts of {db_name}:", len(users))
+
+        if len(users) == 0:
+            continue
+
+        users = rank_users(users)
+
+        columns = ['cohort', 'hallTicketNo'] + [f'{platform}Username' for platform in PLATFORMS] + list(PERCENTILE_WEIGHTS)
+        columns += ['TotalRating', 'Percentile', 'CohortRank', 'GlobalPercentile', 'GlobalRank']
+        users = users.reindex(columns=columns).rename(columns=GLOBAL_LEADERBOARD_COLUMNS)
+
+        file_name = f"{db_name}-GLOBAL-LEADERBOARD.xlsx"
+        users.to_excel(file_name, index=False, engine='openpyxl')
+        print(f"Saved global leaderboard report to {file_name}")
+
+def rank_users(users: pd.DataFrame) -> pd.DataFrame:
+    """Add cohort and global scores and ranks (1 is best, ties share the best rank), sorted by global rank."""
+    ratings = rating_matrix(users)
+
+    users['TotalRating'], users['GlobalPercentile'] = score_ratings(ratings, rating_maxima(ratings))
+
+    users['Percentile'] = 0.0
+    for cohort, positions in users.groupby('cohort').indices.items():
+        cohort_ratings = ratings[positions]
+        _, percentile = score_ratings(cohort_ratings, rating_maxima(cohort_ratings))
+        users.iloc[positions, users.columns.get_loc('Percentile')] = percentile
+
+    users['CohortRank'] = users.groupby('cohort')['Percentile'].rank(method='min', ascending=False).astype(int)
+    users['GlobalRank'] = users['GlobalPercentile'].rank(method='min', ascending=False).astype(int)
+    return users.sort_values(['GlobalRank', 'cohort', 'CohortRank'], kind='stable')
@@ -0,0 +1,185 @@
+# cmrit_leaderboard/http_archive.py
+
+import os
+import json
+import time
+import atexit
+import base64
+import hashlib
+import threading
+import requests
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+from requests.adapters import BaseAdapter, HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+from cmrit_leaderboard.config import Config, HTTP_ARCHIVE_IGNORED_PARAMS, HTTP_ARCHIVE_HEADERS, HTTP_ARCHIVE_REDACTED_FIELDS, HTTP_ARCHIVE_REDACTED, HTTP_REPLAY_RATE_LIMITS
+from cmrit_leaderboard.rate_limiter import TokenBucket
+
+HTTP_MODES = ['live', 'record', 'replay']
+
+def archive_path(platform):
+    return os.path.join(Config.HTTP_ARCHIVE_DIR, f'{platform}.jsonl')
+
+def archive_key(request):
+    """
+    Method, URL and a digest of the body identifying a request across runs.
+
+    Per-run query parameters (timestamps, signatures, API keys) are dropped, and the
+    body is only kept as a digest so credentials never reach the archive.
+    """
+    url = urlsplit(request.url)
+    query = [(name, value) for name, value in parse_qsl(url.query, keep_blank_values=True) if name not in HTTP_ARCHIVE_IGNORED_PARAMS]
+    body = request.body or b''
+    if isinstance(body, str):
+        body = body.encode()
+    digest = hashlib.sha1(body).hexdigest()[:16] if body else '-'
+    return f"{request.method} {urlunsplit(url._replace(query=urlencode(query)))} {digest}"
+
+def redact(value):
+    """
+    Copy of a decoded JSON body with every HTTP_ARCHIVE_REDACTED_FIELDS value replaced.
+
+    The replacement ends with a digest of the value, so replayed requests of different
+    credentials still send different Authorization headers.
+    """
+    if isinstance(value, dict):
+        return {name: redacted(item) if name.lower() in HTTP_ARCHIVE_REDACTED_FIELDS else redact(item) for name, item in value.items()}
+    if isinstance(value, list):
+        return [redact(item) for item in value]
+    return value
+
+def redacted(value):
+    return f"{HTTP_ARCHIVE_REDACTED}-{hashlib.sha1(str(value).encode()).hexdigest()[:8]}"
+
+def redact_text(text):
+    """Response text with token fields redacted, unchanged when it is not JSON."""
+    try:
+        content = json.loads(text)
+    except ValueError:
+        return text
+    redacted = redact(content)
+    return text if redacted == content else json.dumps(redacted)
+
+def ends_with_complete_line(path):
+    """Whether an archive is missing, empty or ends with a newline."""
+    if not os.path.exists(path) or os.path.getsize(path) == 0:
+        return True
+    with open(path, 'rb') as file:
+        file.seek(-1, os.SEEK_END)
+        return file.read(1) == b'\n'
+
+class RecordingAdapter(HTTPAdapter):
+    """
+    Sends requests over the network and appends every response to the platform's archive.
+
+    Only the HTTP_ARCHIVE_HEADERS response headers are kept, so request headers such as
+    Authorization never reach the archive, and tokens in JSON bodies are redacted.
+    Every response is flushed as one JSON line, so a killed run loses at most its last line.
+    """
+    def __init__(self, platform, **kwargs):
+        super().__init__(**kwargs)
+        os.makedirs(Config.HTTP_ARCHIVE_DIR, exist_ok=True)
+        path = archive_path(platform)
+        complete = ends_with_complete_line(path)
+        self.file = open(path, 'a', encoding='utf-8')
+        if not complete:
+            # Start on a fresh line after a cut short one
+            self.file.write('\n')
+        self.lock = threading.Lock()
+        atexit.register(self.file.close)
+
+    def send(self, request, **kwargs):
+        started = time.perf_counter()
+        response = super().send(request, **kwargs)
+        # Reading the body here makes the recorded latency cover the whole transfer
+        content = response.content
+        entry = {
+            'key': archive_key(request),
+            'status': response.status_code,
+            'reason': response.reason,
+            'headers': {name: value for name, value in response.headers.items() if name.lower() in HTTP_ARCHIVE_HEADERS},
+            'elapsed': round(time.perf_counter() - started, 4),
+        }
+        # The content is already decompressed
+        try:
+            entry['text'] = redact_text(content.decode('utf-8'))
+        except UnicodeDecodeError:
+            entry['base64'] = base64.b64encode(content).decode()
+        with self.lock:
+            self.file.write(json.dumps(entry, separators=(',', ':')) + '\n')
+            self.file.flush()
+        return response
+
+class ReplayAdapter(BaseAdapter):
+    """
+    Serves a platform's archived responses without touching the network.
+
+    Repeated requests get their recorded responses in order, then the last one again.
+    Each response is delayed by its recorded latency, or by Config.HTTP_REPLAY_LATENCY
+    seconds when set. With Config.HTTP_REPLAY_RATE_LIMITED, requests beyond the
+    platform's HTTP_REPLAY_RATE_LIMITS get a 429 with Retry-After, like a throttling server.
+    Each Authorization header gets its own limit, like an API limiting each client.
+    """
+    def __init__(self, platform):
+        super().__init__()
+        self.platform = platform
+        self.responses = {}
+        self.served = {}
+        self.lock = threading.Lock()
+        path = archive_path(platform)
+        if os.path.exists(path):
+            with open(path, encoding='utf-8') as file:
+                for line in file:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        # The last line of a killed run may be cut short
+                        continue
+                    self.responses.setdefault(entry['key'], []).append(entry)
+        print(f"Replaying {sum(map(len, self.responses.values()))} recorded {platform} responses from {path}")
+
+        self.rate_limited = Config.HTTP_REPLAY_RATE_LIMITED and platform in HTTP_REPLAY_RATE_LIMITS
+        self.server_limits = {}
+
+    def server_limit(self, request):
+        """Simulated server bucket of the client sending the request."""
+        client = request.headers.get('Authorization', '')
+        with self.lock:
+            if client not in self.server_limits:
+                rate, burst = HTTP_REPLAY_RATE_LIMITS[self.platform]
+                self.server_limits[client] = TokenBucket(f'{self.platform} replay', rate, burst, rate, rate)
+            return self.server_limits[client]
+
+    def send(self, request, **kwargs):
+        key = archive_key(request)
+        if self.rate_limited:
+            wait = self.server_limit(request).try_acquire()
+            if wait:
+                return self.build_response(request, {'status': 429, 'reason': 'Too Many Requests', 'headers': {'Retry-After': f'{wait:.3f}'}, 'text': ''})
+
+        with self.lock:
+            entries = self.responses.get(key)
+            if not entries:
+                raise requests.ConnectionError(f"No recorded {self.platform} response for {key}")
+            position = self.served.get(key, 0)
+            self.served[key] = position + 1
+            entry = entries[min(position, len(entries) - 1)]
+
+        latency = Config.HTTP_REPLAY_LATENCY if Config.HTTP_REPLAY_LATENCY is not None else entry.get('elapsed', 0)
+        time.sleep(latency)
+        return self.build_response(request, entry)
+
+    def build_response(self, request, entry):
+        response = requests.Response()
+        response.status_code = entry['status']
+        response.reason = entry.get('reason')
+        response.headers = CaseInsensitiveDict(entry.get('headers', {}))
+        response.encoding = get_encoding_from_headers(response.headers) or 'utf-8'
+        response._content = base64.b64decode(entry['base64']) if 'base64' in entry else entry['text'].encode('utf-8')
+        response.url = request.url
+        response.request = request
+        return response
+
+    def close(self):
+        pass
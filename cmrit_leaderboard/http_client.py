@@ -0,0 +1,124 @@
+# cmrit_leaderboard/http_client.py
+
+import time
+import threading
+import statistics
+import requests
+from requests.adapters import HTTPAdapter
+
+from cmrit_leaderboard.config import Config, HTTP_DEFAULT_HEADERS, HTTP_TIMEOUT, HTTP_POOL_SIZE, HTTP_THROTTLE_RETRIES
+from cmrit_leaderboard.rate_limiter import get_rate_limiter, is_throttled, parse_retry_after
+from cmrit_leaderboard.http_archive import RecordingAdapter, ReplayAdapter
+
+# One client per platform, shared by its verifier and scraper and by every thread
+_clients = {}
+_clients_lock = threading.Lock()
+
+def get_http_client(platform):
+    with _clients_lock:
+        if platform not in _clients:
+            _clients[platform] = HttpClient(platform)
+        return _clients[platform]
+
+class HttpClient:
+    """
+    Keep-alive HTTP session of one platform.
+
+    Connections are pooled per host and reused across requests, responses are
+    requested gzip compressed, and every request gets the browser headers and a
+    timeout unless the caller passes its own. The latency of every request is kept
+    so a run can report how the platform behaved.
+
+    Requests wait for the platform's token bucket, or for the `limiter` passed with the
+    request when several API credentials share one platform. Throttled responses (429 or a
+    Cloudflare block) slow the bucket down and are retried up to HTTP_THROTTLE_RETRIES
+    times before being returned to the caller. Every bucket used is reported by `print_stats`.
+
+    Config.HTTP_MODE swaps the transport: 'record' archives every response of a live
+    run, 'replay' serves them back from the archive without any network access.
+    """
+    def __init__(self, platform):
+        self.platform = platform
+        self.session = requests.Session()
+        self.session.headers.update(HTTP_DEFAULT_HEADERS)
+        if Config.HTTP_MODE == 'record':
+            adapter = RecordingAdapter(platform, pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE)
+        elif Config.HTTP_MODE == 'replay':
+            adapter = ReplayAdapter(platform)
+        else:
+            adapter = HTTPAdapter(pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.latencies = []
+        self.errors = 0
+        self.throttled = 0
+        self.lock = threading.Lock()
+        self.limiter = get_rate_limiter(platform)
+        self.limiters = {}
+
+    def request(self, method, url, limiter=None, **kwargs):
+        limiter = limiter or self.limiter
+        with self.lock:
+            self.limiters.setdefault(limiter.platform, limiter)
+        kwargs.setdefault('timeout', HTTP_TIMEOUT)
+        for _ in range(HTTP_THROTTLE_RETRIES + 1):
+            limiter.acquire()
+            response = self.send(method, url, **kwargs)
+            if not is_throttled(response):
+                limiter.on_success()
+                return response
+            with self.lock:
+                self.throttled += 1
+            limiter.on_throttled(parse_retry_after(response))
+        return response
+
+    def send(self, method, url, **kwargs):
+        started = time.perf_counter()
+        try:
+            return self.session.request(method, url, **kwargs)
+        except requests.RequestException:
+            with self.lock:
+                self.errors += 1
+            raise
+        finally:
+            with self.lock:
+                self.latencies.append(time.perf_counter() - started)
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request('POST', url, **kwargs)
+
+    def stats(self):
+        with self.lock:
+            latencies = sorted(self.latencies)
+            errors = self.errors
+            throttled = self.throttled
+        if not latencies:
+            return {'requests': 0, 'errors': errors, 'throttled': throttled}
+        return {
+            'requests': len(latencies),
+            'errors': errors,
+            'throttled': throttled,
+            'mean': statistics.mean(latencies),
+            'p50': latencies[len(latencies) // 2],
+            'p95': latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))],
+            'max': latencies[-1],
+        }
+
+    def print_stats(self):
+        stats = self.stats()
+        if stats['requests'] == 0:
+            return
+        with self.lock:
+            limiters = list(self.limiters.values())
+        if len(limiters) == 1:
+            rates = f"{limiters[0].rate:.2f}"
+        else:
+            # One bucket per API credential
+            rates = ', '.join(f"{limiter.platform} {limiter.rate:.2f}" for limiter in limiters)
+        print(f"{self.platform} HTTP: {stats['requests']} requests, {stats['errors']} errors, {stats['throttled']} throttled, "
+              f"latency mean {stats['mean'] * 1000:.0f}ms, p50 {stats['p50'] * 1000:.0f}ms, "
+              f"p95 {stats['p95'] * 1000:.0f}ms, max {stats['max'] * 1000:.0f}ms, "
+              f"rate now {rates} requests/s")
@@ -1,8 +1,17 @@
+import os
+import json
+import math
+import shutil
 import pandas as pd
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
 from openpyxl.utils import get_column_letter
-from openpyxl.styles import Font, Alignment, PatternFill, Border, Side
-from cmrit_leaderboard.config import Config, LEADERBOARD_REPORT_FILE
-from cmrit_leaderboard.database import Database
+from openpyxl.styles import Font, Alignment, PatternFill, Border, Side, NamedStyle
+from openpyxl.formatting.rule import Rule
+from openpyxl.styles.differential import DifferentialStyle
+from cmrit_leaderboard.config import Config, WEB_EXPORT_DIR, WEB_PAGE_SIZE
+from cmrit_leaderboard.database import get_database
+from cmrit_leaderboard.rank_delta import SNAPSHOT_COLUMNS, load_ranking_snapshot, save_ranking_snapshot, compute_rank_deltas, write_movers_report
 
 class Leaderboard:
     HALL_TICKET_NO = 0
@@ -25,99 +34,259 @@ class Leaderboard:
     TOTAL_RATING = 17
     PERCENTILE = 18
 
+    # (header, user document field) in column order
+    COLUMNS = [
+        ('Hall Ticket No', 'hallTicketNo'),
+        ('CodeChef Username', 'codechefUsername'),
+        ('CodeChef Rating', 'codechefRating'),
+        ('Codeforces Username', 'codeforcesUsername'),
+        ('Codeforces Rating', 'codeforcesRating'),
+        ('GeeksforGeeks Username', 'geeksforgeeksUsername'),
+        ('GeeksforGeeks Weekly Rating', 'geeksforgeeksWeeklyRating'),
+        ('GeeksforGeeks Practice Rating', 'geeksforgeeksPracticeRating'),
+        ('Leetcode Username', 'leetcodeUsername'),
+        ('Leetcode Rating', 'leetcodeRating'),
+        ('Hackerrank Username', 'hackerrankUsername'),
+        ('Hackerrank Rating', 'hackerrankRating'),
+        ('Codechef Status', 'codechefStatus'),
+        ('Codeforces Status', 'codeforcesStatus'),
+        ('GeeksforGeeks Status', 'geeksforgeeksStatus'),
+        ('Leetcode Status', 'leetcodeStatus'),
+        ('Hackerrank Status', 'hackerrankStatus'),
+        ('Total Rating', 'TotalRating'),
+        ('Percentile', 'Percentile'),
+    ]
+
+    # Appended after COLUMNS so the column indices above stay put, filled from the rank deltas
+    DELTA_COLUMNS = [
+        ('Rank', 'rank'),
+        ('Previous Rank', 'rankPrevious'),
+        ('Rank Change', 'RankChange'),
+        ('Percentile Change', 'PercentileChange'),
+    ]
+
+    # Columns highlighted when a platform's status column is False (invalid handle)
+    STATUS_HIGHLIGHTS = {
+        CODECHEF_STATUS: [CODECHEF_USERNAME, CODECHEF_RATING],
+        CODEFORCES_STATUS: [CODEFORCES_USERNAME, CODEFORCES_RATING],
+        GEEKSFORGEEKS_STATUS: [GEEKSFORGEEKS_USERNAME, GEEKSFORGEEKS_WEEKLY_RATING, GEEKSFORGEEKS_PRACTICE_RATING],
+        LEETCODE_STATUS: [LEETCODE_USERNAME, LEETCODE_RATING],
+        HACKERRANK_STATUS: [HACKERRANK_USERNAME, HACKERRANK_RATING],
+    }
+
     def __init__(self):
-        self.db = Database()
+        self.db = get_database()
 
     def build_leaderboard(self):
-        print("Fetching all users...")
+        """
+        Stream the users into a styled workbook in a single pass.
+
+        Users are read from the cursor straight into row tuples, sorted by Percentile and
+        appended to an openpyxl write-only worksheet, so the file is never loaded back.
+        Each row also carries its rank and its movement since the previous build, whose
+        ranking is kept as a small snapshot and replaced once this build is written.
+        """
         users = self.get_users()
-        data = self.prepare_data(users)
+        rows = self.sort_rows(self.prepare_data(users))
+
+        ranking = pd.DataFrame(self.ranked_records(rows), columns=SNAPSHOT_COLUMNS)
+        previous = load_ranking_snapshot(Config.USERS_COLLECTION)
+        deltas = compute_rank_deltas(ranking, previous)
 
-        df = self.create_dataframe(data)
-        df.to_excel(Config.USERS_COLLECTION + '.xlsx', index=False, engine='openpyxl')
+        file_name = Config.USERS_COLLECTION + '.xlsx'
+        self.write_workbook(self.add_delta_columns(rows, deltas), file_name)
 
-        with pd.ExcelWriter(Config.USERS_COLLECTION + '.xlsx', engine='openpyxl', mode='a') as writer:
-            self.style_worksheet(writer, df)
+        print(f"Saved leaderboard report of {len(rows)} users to {file_name}")
 
-        print(f"Saved leaderboard report to {Config.USERS_COLLECTION + '.xlsx'}")
+        if previous is None:
+            print("No previous ranking snapshot, skipping the movers report")
+        else:
+            write_movers_report(deltas, Config.USERS_COLLECTION + '-MOVERS.xlsx')
+
+        self.export_static(rows, os.path.join(WEB_EXPORT_DIR, Config.USERS_COLLECTION))
+        save_ranking_snapshot(Config.USERS_COLLECTION, ranking)
 
     def get_users(self):
         print("Fetching all users...")
-        return self.db.get_all_users()
+        return self.db.get_all_users(fields=[field for _, field in self.COLUMNS])
 
     def prepare_data(self, users):
-        data = []
-        for user in users:
-            print(f"Processing user {user['hallTicketNo']}")
-            data.append({
-                'Hall Ticket No': user['hallTicketNo'],
-                'CodeChef Username': user.get('codechefUsername'),
-                'CodeChef Rating': user.get('codechefRating'),
-                'Codeforces Username': user.get('codeforcesUsername'),
-                'Codeforces Rating': user.get('codeforcesRating'),
-                'GeeksforGeeks Username': user.get('geeksforgeeksUsername'),
-                'GeeksforGeeks Weekly Rating': user.get('geeksforgeeksWeeklyRating'),
-                'GeeksforGeeks Practice Rating': user.get('geeksforgeeksPracticeRating'),
-                'Leetcode Username': user.get('leetcodeUsername'),
-                'Leetcode Rating': user.get('leetcodeRating'),
-                'Hackerrank Username': user.get('hackerrankUsername'),
-                'Hackerrank Rating': user.get('hackerrankRating'),
-                'Codechef Status': user.get('codechefStatus'),
-                'Codeforces Status': user.get('codeforcesStatus'),
-                'GeeksforGeeks Status': user.get('geeksforgeeksStatus'),
-                'Leetcode Status': user.get('leetcodeStatus'),
-                'Hackerrank Status': user.get('hackerrankStatus'),
-                'Total Rating': user.get('TotalRating'),
-                'Percentile': user.get('Percentile'),
-            })
-        return data
-
-    def create_dataframe(self, data):
-        df = pd.DataFrame(data)
-        return df.sort_values(by='Percentile', ascending=False)
-
-    def style_worksheet(self, writer, df):
-        workbook = writer.book
-        worksheet = writer.sheets['Sheet1']
-
-        self.apply_header_styles(worksheet)
-        self.set_column_widths(worksheet, df)
-        self.apply_conditional_formatting(worksheet)
+        return [tuple(clean_value(user.get(field)) for _, field in self.COLUMNS) for user in users]
+
+    def sort_rows(self, rows):
+        # Highest Percentile first, users without one at the bottom
+        return sorted(rows, key=lambda row: (row[self.PERCENTILE] is None, -(row[self.PERCENTILE] or 0)))
 
+    def add_delta_columns(self, rows, deltas):
+        current = deltas[deltas['presence'] != 'right_only']
+        delta_rows = {
+            delta['hallTicketNo']: tuple(delta_value(delta[field]) for _, field in self.DELTA_COLUMNS)
+            for delta in current.to_dict('records')
+        }
+        return [row + delta_rows[row[self.HALL_TICKET_NO]] for row in rows]
+
+    def write_workbook(self, rows, file_name):
+        workbook = Workbook(write_only=True)
+        workbook.add_named_style(self.header_style())
+        worksheet = workbook.create_sheet('Sheet1')
+
+        # Column dimensions have to be set before the first row is written
+        self.set_column_widths(worksheet, rows)
         # Hide Status columns
         for i in range(self.CODECHEF_STATUS, self.TOTAL_RATING):
             worksheet.column_dimensions[get_column_letter(i + 1)].hidden = True
+        self.apply_conditional_formatting(worksheet, len(rows))
+
+        worksheet.append(self.header_cells(worksheet))
+        for row in rows:
+            worksheet.append(row)
+
+        workbook.save(file_name)
 
-    def apply_header_styles(self, worksheet):
-        header_font = Font(bold=True, color="FFFFFF")
-        header_fill = PatternFill(start_color="4F81BD", fill_type="solid")
+    def header_style(self):
         border = Border(left=Side(style='thin'), right=Side(style='thin'),
                         top=Side(style='thin'), bottom=Side(style='thin'))
+        return NamedStyle(
+            name="Leaderboard Header",
+            font=Font(bold=True, color="FFFFFF"),
+            fill=PatternFill(start_color="4F81BD", fill_type="solid"),
+            alignment=Alignment(horizontal="center"),
+            border=border,
+        )
 
-        for cell in worksheet[1]:
-            cell.font = header_font
-            cell.fill = header_fill
-            cell.alignment = Alignment(horizontal="center")
-            cell.border = border
+    def header_cells(self, worksheet):
+        cells = []
+        for header, _ in self.COLUMNS + self.DELTA_COLUMNS:
+            cell = WriteOnlyCell(worksheet, value=header)
+            cell.style = "Leaderboard Header"
+            cells.append(cell)
+        return cells
 
-    def set_column_widths(self, worksheet, df):
-        for i, col in enumerate(df.columns, 1):
+    def set_column_widths(self, worksheet, rows):
+        for i, (header, _) in enumerate(self.COLUMNS + self.DELTA_COLUMNS):
             # Calculate max width of header and column content
-            max_length = max(df[col].astype(str).str.len().max(), len(col)) + 2
-            worksheet.column_dimensions[get_column_letter(i)].width = max_length
+            max_length = max((len(str(row[i])) for row in rows if row[i] is not None), default=0)
+            worksheet.column_dimensions[get_column_letter(i + 1)].width = max(max_length, len(header)) + 2
 
-    def apply_conditional_formatting(self, worksheet):
-        bad_fill = PatternFill(start_color="FFC7CE", fill_type="solid")
+    def apply_conditional_formatting(self, worksheet, row_count):
+        """
+        Highlight the handle and rating cells of invalid handles with one rule per platform.
+
+        Excel evaluates the rules when the sheet is opened, so the workbook carries five
+        rules and a single differential style instead of a style per highlighted cell.
+        """
+        if row_count == 0:
+            return
+
+        bad_fill = PatternFill(start_color="FFC7CE", end_color="FFC7CE", fill_type="solid")
         border = Border(left=Side(style='thin'), right=Side(style='thin'),
                         top=Side(style='thin'), bottom=Side(style='thin'))
+        invalid_style = DifferentialStyle(fill=bad_fill, border=border, font=Font(color="9C0006"))
+        last_row = row_count + 1  # Skip header row
+
+        for status_column, columns in self.STATUS_HIGHLIGHTS.items():
+            status_letter = get_column_letter(status_column + 1)
+            cell_range = f"{get_column_letter(columns[0] + 1)}2:{get_column_letter(columns[-1] + 1)}{last_row}"
+            rule = Rule(type="expression", dxf=invalid_style, formula=[f"${status_letter}2=FALSE"])
+            worksheet.conditional_formatting.add(cell_range, rule)
+
+    def ranked_records(self, rows):
+        """Sorted rows as dicts keyed by user document field, each with its competition rank."""
+        fields = [field for _, field in self.COLUMNS]
+        ranks = competition_ranks([row[self.PERCENTILE] for row in rows])
+        return [{'rank': rank, **dict(zip(fields, row))} for rank, row in zip(ranks, rows)]
+
+    def export_static(self, rows, export_dir, page_size=WEB_PAGE_SIZE):
+        """
+        Write the sorted leaderboard as static files a website can serve directly.
+
+        - leaderboard.parquet: every row, columnar, for analysis
+        - pages/<n>.json: fixed-size pages of `page_size` rows, 1-based, best first
+        - lookup.json: hall ticket -> rank, page, Total Rating and Percentile
+        - manifest.json: counts, page size and file layout, written last
+        """
+        fields = [field for _, field in self.COLUMNS]
+        records = self.ranked_records(rows)
+        total_pages = max(1, math.ceil(len(records) / page_size))
+
+        pages_dir = os.path.join(export_dir, 'pages')
+        # Drop pages of a previous, larger build
+        shutil.rmtree(pages_dir, ignore_errors=True)
+        os.makedirs(pages_dir)
+
+        for page in range(1, total_pages + 1):
+            page_records = records[(page - 1) * page_size:page * page_size]
+            write_json(os.path.join(pages_dir, f'{page}.json'), {'page': page, 'totalPages': total_pages, 'rows': page_records})
+
+        lookup = {
+            record['hallTicketNo']: {
+                'rank': record['rank'],
+                'page': position // page_size + 1,
+                'TotalRating': record['TotalRating'],
+                'Percentile': record['Percentile'],
+            }
+            for position, record in enumerate(records)
+        }
+        write_json(os.path.join(export_dir, 'lookup.json'), lookup)
+
+        files = ['lookup.json', 'pages/{page}.json']
+        try:
+            parquet_frame(records, ['rank'] + fields).to_parquet(os.path.join(export_dir, 'leaderboard.parquet'), index=False)
+            files.append('leaderboard.parquet')
+        except ImportError as e:
+            print(f"Skipping the Parquet export: {e}")
+
+        write_json(os.path.join(export_dir, 'manifest.json'), {
+            'collection': Config.USERS_COLLECTION,
+            'generatedAt': pd.Timestamp.now().isoformat(),
+            'totalStudents': len(records),
+            'pageSize': page_size,
+            'totalPages': total_pages,
+            'columns': ['rank'] + fields,
+            'files': files,
+        })
+
+        print(f"Exported {total_pages} pages of {len(records)} users to {export_dir}")
+
+def competition_ranks(percentiles):
+    """1-based ranks for values already sorted best first, ties share the best rank."""
+    ranks = []
+    for position, percentile in enumerate(percentiles):
+        if position > 0 and percentile == percentiles[position - 1]:
+            ranks.append(ranks[-1])
+        else:
+            ranks.append(position + 1)
+    return ranks
+
+def parquet_frame(records, columns):
+    """
+    Records as a frame Parquet can store: one type per column.
+
+    Ratings like '' or '#n/a' become NaN and other columns holding mixed types (a numeric
+    looking handle next to text ones) become strings. The JSON files keep the raw values.
+    """
+    frame = pd.DataFrame(records, columns=columns)
+    for column in columns:
+        if column == 'rank' or column.endswith('Rating') or column == 'Percentile':
+            frame[column] = pd.to_numeric(frame[column], errors='coerce')
+        elif pd.api.types.infer_dtype(frame[column], skipna=True).startswith('mixed'):
+            frame[column] = frame[column].astype('string')
+    return frame
+
+def write_json(path, data):
+    with open(path, 'w') as file:
+        # Compact separators keep the shards small
+        json.dump(data, file, separators=(',', ':'), default=str)
+
+def delta_value(value):
+    # Ranks come back from the merge as floats, missing ones as NaN
+    value = clean_value(value)
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
 
-        for row in worksheet.iter_rows(min_row=2):  # Skip header row
-            for status_column in [self.CODECHEF_STATUS, self.CODEFORCES_STATUS,
-                                  self.GEEKSFORGEEKS_STATUS, self.LEETCODE_STATUS,
-                                  self.HACKERRANK_STATUS]:
-                if row[status_column].value is False:
-                    start_cell = row[status_column - 11]  # Adjust the index based on status position
-                    for cell in row[start_cell.column - 1:start_cell.column + 1]:  # Adjust the range as needed
-                        cell.fill = bad_fill
-                        cell.border = border
-                        cell.font = Font(color="9C0006")
+def clean_value(value):
+    # NaN is written as an empty cell, like DataFrame.to_excel did
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    return value
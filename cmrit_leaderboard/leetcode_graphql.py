@@ -0,0 +1,59 @@
+# cmrit_leaderboard/leetcode_graphql.py
+
+from cmrit_leaderboard.config import LEETCODE_URL, LEETCODE_GRAPHQL_URL, LEETCODE_CONTEST_RANKING_FIELDS, LEETCODE_BATCH_SIZE, LEETCODE_SESSION, LEETCODE_CSRF_TOKEN
+from cmrit_leaderboard.http_client import get_http_client
+
+def contest_ranking_query(count):
+    """GraphQL query for the userContestRanking of `count` handles, aliased u0, u1, ..."""
+    variables = ', '.join(f'$u{number}: String!' for number in range(count))
+    fields = ' '.join(f'u{number}: userContestRanking(username: $u{number}) {{ {LEETCODE_CONTEST_RANKING_FIELDS} }}' for number in range(count))
+    return f'query contestRankings({variables}) {{ {fields} }}'
+
+def fetch_contest_rankings(handles):
+    """
+    Fetch the userContestRanking of every handle, LEETCODE_BATCH_SIZE handles per request.
+
+    Yields one dict per request mapping handle -> (ranking, error). The ranking is None
+    for users without contests, the error is the GraphQL message reported for that
+    handle's alias, e.g. for a user that does not exist.
+    """
+    # Each handle is asked for once, however many participants share it
+    handles = list(dict.fromkeys(handles))
+    for start in range(0, len(handles), LEETCODE_BATCH_SIZE):
+        yield fetch_contest_ranking_batch(handles[start:start + LEETCODE_BATCH_SIZE])
+
+def fetch_contest_ranking_batch(handles):
+    aliases = {f'u{number}': handle for number, handle in enumerate(handles)}
+    response = get_http_client('leetcode').post(LEETCODE_GRAPHQL_URL,
+                                                json={'query': contest_ranking_query(len(handles)), 'variables': aliases},
+                                                headers=session_headers(),
+                                                cookies=session_cookies())
+    try:
+        content = response.json()
+    except ValueError:
+        raise RuntimeError(f"Invalid JSON response from LeetCode GraphQL ({response.status_code}): {response.text[:200]}")
+
+    errors = {}
+    for error in content.get('errors') or []:
+        path = error.get('path') or []
+        if not path or path[0] not in aliases:
+            raise RuntimeError(f"LeetCode GraphQL request failed: {error.get('message')}")
+        errors[path[0]] = error.get('message')
+
+    data = content.get('data') or {}
+    return {handle: (data.get(alias), errors.get(alias)) for alias, handle in aliases.items()}
+
+def session_headers():
+    # LeetCode rejects POSTs without a same-site Referer, and with a session also wants the CSRF token
+    headers = {'Referer': LEETCODE_URL}
+    if LEETCODE_CSRF_TOKEN:
+        headers['x-csrftoken'] = LEETCODE_CSRF_TOKEN
+    return headers
+
+def session_cookies():
+    cookies = {}
+    if LEETCODE_SESSION:
+        cookies['LEETCODE_SESSION'] = LEETCODE_SESSION
+    if LEETCODE_CSRF_TOKEN:
+        cookies['csrftoken'] = LEETCODE_CSRF_TOKEN
+    return cookies
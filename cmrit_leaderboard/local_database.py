@@ -0,0 +1,248 @@
+# cmrit_leaderboard/local_database.py
+
+import os
+import json
+import math
+import sqlite3
+import threading
+import datetime
+import pandas as pd
+
+from cmrit_leaderboard.config import Config, PLATFORMS, LOCAL_DATABASE_DIR, UPLOAD_CHUNK_SIZE, HISTORY_RETENTION_DAYS, HISTORY_LOOKBACK_DAYS
+from cmrit_leaderboard.database import BaseDatabase, Database, changed_fields, platform_user_projection, print_upload_summary, rating_history_points
+
+def encode_value(value):
+    # NaN is not valid JSON for SQLite's json functions, and reads back as NaN in pandas anyway
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    if isinstance(value, datetime.datetime):
+        return {'$date': value.isoformat()}
+    return value
+
+def decode_object(obj):
+    if len(obj) == 1 and '$date' in obj:
+        return pd.Timestamp(obj['$date'])
+    return obj
+
+def encode_document(document):
+    return json.dumps({field: encode_value(value) for field, value in document.items()})
+
+def decode_document(text):
+    return json.loads(text, object_hook=decode_object)
+
+def project(users, fields):
+    if fields is None:
+        return users
+    return [{field: user[field] for field in fields if field in user} for user in users]
+
+class LocalDatabase(BaseDatabase):
+    """
+    Embedded SQLite backend.
+
+    Every user is stored as a JSON document in a single table keyed by
+    (collection, hallTicketNo), so the batch collections of a DB_NAME live in one file.
+    """
+    def __init__(self):
+        os.makedirs(LOCAL_DATABASE_DIR, exist_ok=True)
+        self.path = os.path.join(LOCAL_DATABASE_DIR, f"{Config.DB_NAME}.sqlite3")
+        self.connection = sqlite3.connect(self.path, check_same_thread=False)
+        self.lock = threading.Lock()
+        with self.lock, self.connection:
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS users ("
+                "collection TEXT NOT NULL, "
+                "hallTicketNo TEXT NOT NULL, "
+                "document TEXT NOT NULL, "
+                "PRIMARY KEY (collection, hallTicketNo))"
+            )
+            # Partial expression indexes that cover get_existing_users_for_platform
+            for platform in PLATFORMS:
+                self.connection.execute(
+                    f"CREATE INDEX IF NOT EXISTS {platform}_verified_users "
+                    f"ON users (collection, json_extract(document, '$.{platform}Status')) "
+                    f"WHERE json_extract(document, '$.{platform}Username') IS NOT NULL"
+                )
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS evaluation_state ("
+                "collection TEXT PRIMARY KEY, "
+                "state TEXT NOT NULL)"
+            )
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS rating_history ("
+                "collection TEXT NOT NULL, "
+                "hallTicketNo TEXT NOT NULL, "
+                "platform TEXT NOT NULL, "
+                "timestamp TEXT NOT NULL, "
+                "ratings TEXT NOT NULL)"
+            )
+            self.connection.execute(
+                "CREATE INDEX IF NOT EXISTS rating_history_series "
+                "ON rating_history (collection, hallTicketNo, platform, timestamp)"
+            )
+        self.collection = Config.USERS_COLLECTION
+        print(f"Connected to local database: {self.path} - {self.collection}")
+
+    def find(self, collection=None, where='', params=()):
+        query = "SELECT document FROM users WHERE collection = ?" + (f" AND {where}" if where else '')
+        with self.lock:
+            rows = self.connection.execute(query, (collection or self.collection, *params)).fetchall()
+        return [decode_document(row[0]) for row in rows]
+
+    def find_by_hall_ticket(self, hall_ticket_nos, collection=None):
+        users = {}
+        hall_ticket_nos = list(hall_ticket_nos)
+        # Stay well below SQLite's limit on bound parameters
+        for start in range(0, len(hall_ticket_nos), 500):
+            batch = hall_ticket_nos[start:start + 500]
+            placeholders = ', '.join('?' * len(batch))
+            for user in self.find(collection, f"hallTicketNo IN ({placeholders})", batch):
+                users[user['hallTicketNo']] = user
+        return users
+
+    def write(self, documents, collection=None):
+        rows = [(collection or self.collection, str(document['hallTicketNo']), encode_document(document)) for document in documents]
+        with self.lock, self.connection:
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO users (collection, hallTicketNo, document) VALUES (?, ?, ?)", rows
+            )
+
+    def upsert_user(self, hall_ticket_no, data):
+        # Updated at
+        data['updatedAt'] = pd.Timestamp.now()
+        document = self.find_by_hall_ticket([hall_ticket_no]).get(hall_ticket_no, {'hallTicketNo': hall_ticket_no})
+        document.update(data)
+        self.write([document])
+
+    def get_existing_users_for_platform(self, platform):
+        # Find users with {paltform}Username field and {paltform}Status True
+        users = self.find(where=f"json_extract(document, '$.{platform}Username') IS NOT NULL "
+                                f"AND json_extract(document, '$.{platform}Status') = 1")
+        return project(users, [field for field, include in platform_user_projection(platform).items() if include])
+
+    def get_all_users(self, collection=None, fields=None):
+        return project(self.find(collection), fields)
+
+    def get_users_updated_since(self, timestamp, fields=None):
+        # updatedAt is stored as {"$date": <isoformat>}, which sorts chronologically as text
+        users = self.find(where="json_extract(document, '$.updatedAt.\"$date\"') > ?", params=(pd.Timestamp(timestamp).isoformat(),))
+        return project(users, fields)
+
+    def get_users_across_collections(self, collections, fields=None):
+        placeholders = ', '.join('?' * len(collections))
+        with self.lock:
+            rows = self.connection.execute(
+                f"SELECT collection, document FROM users WHERE collection IN ({placeholders})", list(collections)
+            ).fetchall()
+        users = project([decode_document(document) for _, document in rows], fields)
+        for (collection, _), user in zip(rows, users):
+            user['cohort'] = collection
+        return users
+
+    def get_evaluation_state(self):
+        with self.lock:
+            row = self.connection.execute("SELECT state FROM evaluation_state WHERE collection = ?", (self.collection,)).fetchone()
+        return decode_document(row[0]) if row else None
+
+    def save_evaluation_state(self, state):
+        with self.lock, self.connection:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO evaluation_state (collection, state) VALUES (?, ?)", (self.collection, encode_document(state))
+            )
+
+    def upload_to_db_with_df(self, users: pd.DataFrame, collection=None, chunk_size=UPLOAD_CHUNK_SIZE, updated_at=None) -> dict:
+        """Same contract as Database.upload_to_db_with_df: only changed fields are written, unchanged rows are skipped."""
+        updated_at = updated_at or pd.Timestamp.now()
+        counts = {'matched': 0, 'modified': 0, 'upserted': 0, 'skipped': 0}
+
+        records = users.to_dict('records')
+        for start in range(0, len(records), chunk_size):
+            chunk = records[start:start + chunk_size]
+            existing = self.find_by_hall_ticket([data.get('hallTicketNo') for data in chunk], collection)
+
+            documents = []
+            for data in chunk:
+                hall_ticket_no = data.pop('hallTicketNo', None)
+                data.pop('_id', None)
+                data.pop('updatedAt', None)
+
+                stored = existing.get(hall_ticket_no)
+                changes = changed_fields(data, stored)
+                if stored is not None and not changes:
+                    counts['skipped'] += 1
+                    continue
+
+                if stored is None:
+                    counts['upserted'] += 1
+                    stored = {'hallTicketNo': hall_ticket_no}
+                else:
+                    counts['matched'] += 1
+                    counts['modified'] += 1
+                stored.update(changes)
+                stored['updatedAt'] = updated_at
+                documents.append(stored)
+
+            self.write(documents, collection)
+
+        print_upload_summary(collection or self.collection, len(records), counts)
+        return counts
+
+    def append_rating_history(self, platform, users: pd.DataFrame) -> int:
+        cutoff = (pd.Timestamp.now() - pd.Timedelta(days=HISTORY_RETENTION_DAYS)).isoformat()
+        since = (pd.Timestamp.now() - pd.Timedelta(days=HISTORY_LOOKBACK_DAYS)).isoformat()
+        with self.lock, self.connection:
+            # Retention: drop points that fell out of the window
+            self.connection.execute("DELETE FROM rating_history WHERE collection = ? AND timestamp < ?", (self.collection, cutoff))
+            # SQLite returns the row holding MAX(timestamp) for the bare ratings column
+            rows = self.connection.execute(
+                "SELECT hallTicketNo, ratings, MAX(timestamp) FROM rating_history "
+                "WHERE collection = ? AND platform = ? AND timestamp >= ? GROUP BY hallTicketNo",
+                (self.collection, platform, since)
+            ).fetchall()
+        last_points = {hall_ticket_no: decode_document(ratings) for hall_ticket_no, ratings, _ in rows}
+
+        timestamp = pd.Timestamp.now().isoformat()
+        points = [
+            (self.collection, str(hall_ticket_no), platform, timestamp, encode_document(ratings))
+            for hall_ticket_no, ratings in rating_history_points(platform, users, last_points)
+        ]
+        with self.lock, self.connection:
+            self.connection.executemany(
+                "INSERT INTO rating_history (collection, hallTicketNo, platform, timestamp, ratings) VALUES (?, ?, ?, ?, ?)", points
+            )
+
+        print(f"Appended {len(points)} {platform} rating history points to {self.path}")
+        return len(points)
+
+    def get_rating_history(self, hall_ticket_no, platform=None, start=None, end=None):
+        query = "SELECT platform, timestamp, ratings FROM rating_history WHERE collection = ? AND hallTicketNo = ?"
+        params = [self.collection, hall_ticket_no]
+        if platform:
+            query += " AND platform = ?"
+            params.append(platform)
+        if start is not None:
+            query += " AND timestamp >= ?"
+            params.append(pd.Timestamp(start).isoformat())
+        if end is not None:
+            query += " AND timestamp <= ?"
+            params.append(pd.Timestamp(end).isoformat())
+        with self.lock:
+            rows = self.connection.execute(query + " ORDER BY timestamp", params).fetchall()
+        return [
+            {'timestamp': pd.Timestamp(timestamp), 'meta': {'hallTicketNo': hall_ticket_no, 'platform': row_platform}, **decode_document(ratings)}
+            for row_platform, timestamp, ratings in rows
+        ]
+
+    def replace_collection(self, documents, collection=None):
+        with self.lock, self.connection:
+            self.connection.execute("DELETE FROM users WHERE collection = ?", (collection or self.collection,))
+        self.write(documents, collection)
+
+def take_snapshot():
+    """Copy the current batch's MongoDB collection into the local store."""
+    users = []
+    for user in Database().get_all_users():
+        user.pop('_id', None)
+        users.append(user)
+
+    LocalDatabase().replace_collection(users)
+    print(f"Snapshot of {len(users)} users saved for {Config.DB_NAME} - {Config.USERS_COLLECTION}")
@@ -0,0 +1,75 @@
+# cmrit_leaderboard/rank_delta.py
+
+import os
+import datetime
+import pandas as pd
+
+from cmrit_leaderboard.config import SNAPSHOT_DIR, MOVERS_REPORT_SIZE
+
+# A ranking snapshot only keeps what the next build needs to diff against
+SNAPSHOT_COLUMNS = ['hallTicketNo', 'rank', 'Percentile']
+
+MOVERS_REPORT_COLUMNS = {
+    'hallTicketNo': 'Hall Ticket No',
+    'rank': 'Rank',
+    'rankPrevious': 'Previous Rank',
+    'RankChange': 'Rank Change',
+    'Percentile': 'Percentile',
+    'PercentilePrevious': 'Previous Percentile',
+    'PercentileChange': 'Percentile Change',
+}
+
+def snapshot_path(collection):
+    return os.path.join(SNAPSHOT_DIR, f'{collection}-ranking.csv')
+
+def load_ranking_snapshot(collection):
+    """Ranking saved by the previous build of the collection, or None before the first build."""
+    path = snapshot_path(collection)
+    if not os.path.exists(path):
+        return None
+    built_at = datetime.datetime.fromtimestamp(os.path.getmtime(path))
+    print(f"Comparing against the ranking of {built_at:%Y-%m-%d %H:%M} from {path}")
+    # round_trip keeps unchanged percentiles exactly equal, so their change is 0
+    return pd.read_csv(path, dtype={'hallTicketNo': str}, float_precision='round_trip')
+
+def save_ranking_snapshot(collection, ranking: pd.DataFrame):
+    os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+    ranking[SNAPSHOT_COLUMNS].to_csv(snapshot_path(collection), index=False)
+
+def compute_rank_deltas(current: pd.DataFrame, previous: pd.DataFrame) -> pd.DataFrame:
+    """
+    Outer merge of the current and previous rankings on hallTicketNo.
+
+    `presence` is 'both' for ranked students, 'left_only' for new entrants and
+    'right_only' for drop-outs. RankChange is positive when a student moved up.
+    """
+    if previous is None:
+        previous = pd.DataFrame({
+            'hallTicketNo': pd.Series(dtype=str),
+            'rank': pd.Series(dtype=float),
+            'Percentile': pd.Series(dtype=float),
+        })
+    current = current[SNAPSHOT_COLUMNS].astype({'Percentile': float})
+
+    deltas = current.merge(previous[SNAPSHOT_COLUMNS], on='hallTicketNo', how='outer',
+                           suffixes=('', 'Previous'), indicator='presence')
+    deltas['RankChange'] = deltas['rankPrevious'] - deltas['rank']
+    deltas['PercentileChange'] = deltas['Percentile'] - deltas['PercentilePrevious']
+    return deltas
+
+def write_movers_report(deltas: pd.DataFrame, file_name, size=MOVERS_REPORT_SIZE):
+    """Biggest risers and fallers, plus every new entrant and drop-out, one sheet each."""
+    ranked = deltas[deltas['presence'] == 'both']
+    sheets = {
+        'Risers': ranked[ranked['RankChange'] > 0].sort_values(['RankChange', 'rank'], ascending=[False, True]).head(size),
+        'Fallers': ranked[ranked['RankChange'] < 0].sort_values(['RankChange', 'rank'], ascending=[True, True]).head(size),
+        'New Entrants': deltas[deltas['presence'] == 'left_only'].sort_values('rank'),
+        'Drop-outs': deltas[deltas['presence'] == 'right_only'].sort_values('rankPrevious'),
+    }
+
+    with pd.ExcelWriter(file_name, engine='openpyxl') as writer:
+        for sheet_name, movers in sheets.items():
+            movers = movers.reindex(columns=list(MOVERS_REPORT_COLUMNS)).rename(columns=MOVERS_REPORT_COLUMNS)
+            movers.to_excel(writer, sheet_name=sheet_name, index=False)
+
+    print(f"Saved movers report to {file_name}: " + ', '.join(f"{len(movers)} {name.lower()}" for name, movers in sheets.items()))
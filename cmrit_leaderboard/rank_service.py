@@ -0,0 +1,162 @@
+# cmrit_leaderboard/rank_service.py
+
+import json
+import time
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+from cmrit_leaderboard.config import Config, PLATFORMS, RANK_SERVICE_POLL_SECONDS
+from cmrit_leaderboard.leaderboard import Leaderboard
+
+def branch_of(hall_ticket_no):
+    # Hall tickets look like 21R01A7201: year, college code, then the two digit branch code
+    return str(hall_ticket_no)[6:8].upper()
+
+class RankIndex:
+    """
+    Immutable in-memory rank index of one cohort.
+
+    `records` is sorted best first; hall tickets, platform handles and branches map to
+    positions in it, so every query is a hash lookup plus a slice.
+    """
+    def __init__(self, records):
+        self.records = records
+        self.by_hall_ticket = {}
+        self.by_handle = {}
+        self.by_branch = {}
+        for position, record in enumerate(records):
+            self.by_hall_ticket[str(record['hallTicketNo']).lower()] = position
+            for platform in PLATFORMS:
+                handle = record.get(f'{platform}Username')
+                if handle:
+                    self.by_handle.setdefault(str(handle).lower(), position)
+            self.by_branch.setdefault(branch_of(record['hallTicketNo']), []).append(position)
+
+    @classmethod
+    def from_leaderboard(cls, leaderboard):
+        rows = leaderboard.sort_rows(leaderboard.prepare_data(leaderboard.get_users()))
+        return cls(leaderboard.ranked_records(rows))
+
+    def find(self, student):
+        """Position of a student by hall ticket or by any platform handle, or None."""
+        student = student.lower()
+        position = self.by_hall_ticket.get(student)
+        return position if position is not None else self.by_handle.get(student)
+
+    def top(self, n, branch=None):
+        if branch is None:
+            return self.records[:n]
+        return [self.records[position] for position in self.by_branch.get(branch.upper(), [])[:n]]
+
+    def page(self, page, size):
+        start = max(page - 1, 0) * size
+        return self.records[start:start + size]
+
+    def rank(self, student):
+        position = self.find(student)
+        return None if position is None else self.records[position]
+
+    def neighbourhood(self, student, radius):
+        position = self.find(student)
+        if position is None:
+            return None
+        return self.records[max(0, position - radius):position + radius + 1]
+
+class RankService:
+    """
+    Serves a RankIndex over HTTP and swaps in a fresh one whenever a new evaluation lands.
+
+    The new index is built completely before it replaces the old one in a single
+    assignment, so a request always sees one consistent index.
+    """
+    def __init__(self, poll_seconds=RANK_SERVICE_POLL_SECONDS):
+        self.leaderboard = Leaderboard()
+        self.poll_seconds = poll_seconds
+        self.evaluated_at = None
+        self.index = None
+        # Serializes reloads, queries never take it
+        self.reload_lock = threading.Lock()
+        self.reload()
+
+    def reload(self):
+        with self.reload_lock:
+            state = self.leaderboard.db.get_evaluation_state()
+            started = time.perf_counter()
+            index = RankIndex.from_leaderboard(self.leaderboard)
+            self.index = index
+            self.evaluated_at = state['evaluatedAt'] if state else None
+        print(f"Loaded {len(index.records)} users of {Config.USERS_COLLECTION} in {time.perf_counter() - started:.2f}s "
+              f"(evaluated at {self.evaluated_at})")
+
+    def watch_evaluations(self):
+        while True:
+            time.sleep(self.poll_seconds)
+            try:
+                state = self.leaderboard.db.get_evaluation_state()
+                if state and state['evaluatedAt'] != self.evaluated_at:
+                    print("New evaluation found, reloading...")
+                    self.reload()
+            except Exception as e:
+                print(f"Error checking for a new evaluation: {e}")
+
+    def serve(self, port):
+        threading.Thread(target=self.watch_evaluations, daemon=True).start()
+        server = ThreadingHTTPServer(('', port), make_handler(self))
+        print(f"Serving {Config.USERS_COLLECTION} ranks on http://localhost:{port}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+
+def make_handler(service):
+    class RankRequestHandler(BaseHTTPRequestHandler):
+        # Keep-alive, so load tests measure the lookup rather than TCP setup
+        protocol_version = 'HTTP/1.1'
+        # Headers and body are separate writes, Nagle would hold the body for the delayed ACK
+        disable_nagle_algorithm = True
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            params = {key: values[0] for key, values in parse_qs(url.query).items()}
+            # Read the reference once, a reload during the request does not affect it
+            index = service.index
+
+            try:
+                if url.path == '/top':
+                    result = index.top(int(params.get('n', 50)), params.get('branch'))
+                elif url.path == '/page':
+                    result = index.page(int(params.get('page', 1)), int(params.get('size', 100)))
+                elif url.path == '/rank':
+                    result = index.rank(params['student'])
+                elif url.path == '/neighbourhood':
+                    result = index.neighbourhood(params['student'], int(params.get('radius', 5)))
+                elif url.path == '/reload':
+                    service.reload()
+                    result = {'users': len(service.index.records), 'evaluatedAt': service.evaluated_at}
+                elif url.path == '/health':
+                    result = {'users': len(index.records), 'evaluatedAt': service.evaluated_at}
+                else:
+                    return self.send_json(404, {'error': f'Unknown path {url.path}'})
+            except (KeyError, ValueError) as e:
+                return self.send_json(400, {'error': f'Bad query: {e}'})
+
+            if result is None:
+                return self.send_json(404, {'error': f"Student {params.get('student')} not found"})
+            self.send_json(200, result)
+
+        def send_json(self, status, data):
+            body = json.dumps(data, default=str).encode()
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            # One line per request would dominate the load test
+            pass
+
+    return RankRequestHandler
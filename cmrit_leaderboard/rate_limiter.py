@@ -0,0 +1,102 @@
+# cmrit_leaderboard/rate_limiter.py
+
+import time
+import threading
+import datetime
+from email.utils import parsedate_to_datetime
+
+from cmrit_leaderboard.config import RATE_LIMITS, RATE_LIMIT_INCREASE_AFTER, RATE_LIMIT_INCREASE_FACTOR, RATE_LIMIT_BACKOFF_FACTOR
+
+# One bucket per platform, shared by its verifier, scraper and HTTP client
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+def get_rate_limiter(platform):
+    with _limiters_lock:
+        if platform not in _limiters:
+            _limiters[platform] = TokenBucket(platform, **RATE_LIMITS[platform])
+        return _limiters[platform]
+
+class TokenBucket:
+    """
+    Adaptive token bucket of one platform.
+
+    `acquire` blocks until a token is available. Tokens refill at `rate` per second up to
+    `burst`. After RATE_LIMIT_INCREASE_AFTER successes in a row the rate grows by
+    RATE_LIMIT_INCREASE_FACTOR up to `max_rate`; a throttled response cuts it by
+    RATE_LIMIT_BACKOFF_FACTOR down to `min_rate` and pauses the bucket for the
+    Retry-After the platform asked for.
+    """
+    def __init__(self, platform, rate, burst, min_rate, max_rate):
+        self.platform = platform
+        self.rate = rate
+        self.burst = burst
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.blocked_until = 0
+        self.successes = 0
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            wait = self.try_acquire()
+            if wait == 0:
+                return
+            time.sleep(wait)
+
+    def try_acquire(self):
+        """Take a token without blocking, return 0 on success or the seconds until one is available."""
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if now < self.blocked_until:
+                return self.blocked_until - now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return 0
+            return (1 - self.tokens) / self.rate
+
+    def on_success(self):
+        with self.lock:
+            self.successes += 1
+            if self.successes >= RATE_LIMIT_INCREASE_AFTER and self.rate < self.max_rate:
+                self.rate = min(self.max_rate, self.rate * RATE_LIMIT_INCREASE_FACTOR)
+                self.successes = 0
+
+    def on_throttled(self, retry_after=None):
+        with self.lock:
+            self.successes = 0
+            self.rate = max(self.min_rate, self.rate * RATE_LIMIT_BACKOFF_FACTOR)
+            self.tokens = 0
+            pause = retry_after if retry_after is not None else 1 / self.rate
+            self.blocked_until = max(self.blocked_until, time.monotonic() + pause)
+        print(f"{self.platform} throttled, pausing {pause:.1f}s and slowing down to {self.rate:.2f} requests/s")
+
+def is_throttled(response):
+    """429, or a Cloudflare challenge / block page in front of the platform."""
+    if response.status_code == 429:
+        return True
+    if response.status_code in (403, 503):
+        server = response.headers.get('Server', '').lower()
+        return 'cloudflare' in server or 'cf-ray' in response.headers or 'cloudflare' in response.text.lower()
+    return False
+
+def parse_retry_after(response):
+    """Seconds to wait from a Retry-After header (delay-seconds or HTTP-date), or None."""
+    value = response.headers.get('Retry-After')
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=datetime.timezone.utc)
+    return max(0.0, (retry_at - datetime.datetime.now(datetime.timezone.utc)).total_seconds())
@@ -1,21 +1,53 @@
 # cmrit_leaderboard/scraper.py
 
+import time
 import pandas as pd
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 from scripts.codechef_scraper import scrape_codechef
 from scripts.codeforces_scraper import scrape_codeforces
 from scripts.geeksforgeeks_scraper import scrape_geeksforgeeks
 from scripts.hackerrank_scraper import scrape_hackerrank
 from scripts.leetcode_scraper import scrape_leetcode
-from cmrit_leaderboard.config import CODECHEF_URL, CODEFORCES_URL, GEEKSFORGEEKS_URL, HACKERRANK_URL, LEETCODE_URL
-from cmrit_leaderboard.database import Database
+from cmrit_leaderboard.config import CODECHEF_URL, CODEFORCES_URL, GEEKSFORGEEKS_URL, HACKERRANK_URL, LEETCODE_URL, PLATFORMS, SCRAPE_MAX_WORKERS
+from cmrit_leaderboard.database import get_database
+from cmrit_leaderboard.http_client import get_http_client
+from cmrit_leaderboard.checkpoint import Checkpoint
+
+# Scrapers that request one student at a time and resume from a Checkpoint
+CHECKPOINTED_PLATFORMS = ['codechef', 'geeksforgeeks', 'leetcode']
 
 def scrape_all():
-    scrape_platform('codechef')
-    scrape_platform('codeforces')
-    scrape_platform('geeksforgeeks')
-    scrape_platform('hackerrank')
-    scrape_platform('leetcode')
+    """
+    Scrape every platform concurrently, one worker per platform.
+
+    Each platform keeps pacing itself with its own rate limits, so the run takes about as
+    long as the slowest platform. A failing platform does not stop the others, the
+    failures are reported once all of them are done.
+    """
+    started = time.perf_counter()
+    failures = {}
+
+    with ThreadPoolExecutor(max_workers=SCRAPE_MAX_WORKERS, thread_name_prefix='scraper') as executor:
+        futures = {executor.submit(timed_scrape, platform): platform for platform in PLATFORMS}
+        for future in as_completed(futures):
+            platform = futures[future]
+            try:
+                elapsed = future.result()
+                print(f"Finished scraping {platform} in {elapsed:.0f}s")
+            except Exception as e:
+                failures[platform] = e
+                print(f"Scraping {platform} failed: {e!r}")
+
+    print(f"Scraped {len(PLATFORMS) - len(failures)} of {len(PLATFORMS)} platforms in {time.perf_counter() - started:.0f}s")
+    if failures:
+        print(f"Failed platforms: {', '.join(failures)}")
+        exit(1)
+
+def timed_scrape(platform):
+    started = time.perf_counter()
+    scrape_platform(platform)
+    return time.perf_counter() - started
 
 def scrape_platform(platform):
     url_map = {
@@ -45,7 +77,7 @@ def scrape_platform(platform):
         scraper_function = scrape_function_map[platform]
 
         # Get users from the database with platform-specific details
-        db = Database()
+        db = get_database()
         users = db.get_existing_users_for_platform(platform)
 
         users = pd.DataFrame(users)
@@ -58,8 +90,18 @@ def scrape_platform(platform):
 
         print(users)
 
+        checkpoint = Checkpoint(platform) if platform in CHECKPOINTED_PLATFORMS else None
+
         # Call the scraper function to update the users in the database
-        users = scraper_function(users)
+        try:
+            if checkpoint:
+                users = scraper_function(users, checkpoint)
+            else:
+                users = scraper_function(users)
+        finally:
+            if checkpoint:
+                checkpoint.close()
+        get_http_client(platform).print_stats()
 
         users.replace({' ': ''}, regex=True, inplace=True)
 
@@ -75,3 +117,10 @@ def scrape_platform(platform):
         # Update the database with the updated users
         db.upload_to_db_with_df(users)
 
+        # Keep the ratings of this scrape in the history
+        db.append_rating_history(platform, users)
+
+        # Everything is stored, the next scrape starts from scratch
+        if checkpoint:
+            checkpoint.clear()
+
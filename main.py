@@ -15,10 +15,15 @@ from verifiers.leetcode import process_leetcode
 from verifiers.utils import sheet_download_if_not_exists
 from verifiers.participant import load_participants
 
-from cmrit_leaderboard.config import Config, DESCRIPTION, DB_MAPPING, CODECHEF_FILE, CODEFORCES_FILE, GEEKSFORGEEKS_FILE, HACKERRANK_FILE, LEETCODE_FILE, LIMIT_TEST
+from cmrit_leaderboard.config import Config, DESCRIPTION, DB_MAPPING, PLATFORMS, CODECHEF_FILE, CODEFORCES_FILE, GEEKSFORGEEKS_FILE, HACKERRANK_FILE, LEETCODE_FILE, LIMIT_TEST, RANK_SERVICE_PORT
 from cmrit_leaderboard.scraper import scrape_all, scrape_platform
 from cmrit_leaderboard.leaderboard import Leaderboard
-from cmrit_leaderboard.evaluator import evaluate_leaderboard
+from cmrit_leaderboard.global_leaderboard import build_global_leaderboard
+from cmrit_leaderboard.rank_service import RankService
+from cmrit_leaderboard.http_archive import HTTP_MODES
+from cmrit_leaderboard.evaluator import evaluate_leaderboard, EVALUATION_MODES
+from cmrit_leaderboard.database import STORAGE_BACKENDS
+from cmrit_leaderboard.local_database import take_snapshot
 from scripts.pyramid_scraper import scrape_pyramid_contests, integrate_with_main_leaderboard
 
 def maintain_directories():
@@ -33,26 +38,45 @@ def main():
     parser = argparse.ArgumentParser(description=DESCRIPTION)
     parser.add_argument('--batch', choices=DB_MAPPING.keys(), help='Select a specific batch to run (default is all)', default=None)
     parser.add_argument('--all-batches', action='store_true', help='Run all batches sequentially')
-    parser.add_argument('--scrape', choices=['all', 'codechef', 'codeforces', 'geeksforgeeks', 'hackerrank', 'leetcode'], help='Platform to scrape')
+    parser.add_argument('--scrape', choices=['all'] + PLATFORMS, help='Platform to scrape')
     parser.add_argument('--build', action='store_true', help='Build the leaderboard')
     parser.add_argument('--evaluate', action='store_true', help='Evaluate the leaderboard')
-    parser.add_argument('--verify', choices=['all', 'codechef', 'codeforces', 'geeksforgeeks', 'hackerrank', 'leetcode'], help='Platform to verify')
+    parser.add_argument('--evaluate-mode', choices=EVALUATION_MODES, default='pandas', help='Evaluate in pandas, with an aggregation pipeline inside MongoDB, or only re-score users changed since the last evaluation')
+    parser.add_argument('--verify', choices=['all'] + PLATFORMS, help='Platform to verify')
     parser.add_argument('--clear', action='store_true', help='Clear the logs and reports directories')
     parser.add_argument('--upload', action='store_true', help='Upload data from CSV to database')
     parser.add_argument('--pyramid', action='store_true', help='Scrape pyramid contest data')
     parser.add_argument('--integrate', action='store_true', help='Integrate pyramid data with main leaderboard')
+    parser.add_argument('--storage', choices=STORAGE_BACKENDS, default='mongo', help='Storage backend to read from and write to (sqlite uses a local embedded database)')
+    parser.add_argument('--global-leaderboard', action='store_true', help='Rank all batches together into one combined leaderboard')
+    parser.add_argument('--snapshot', action='store_true', help='Copy the batch from MongoDB into the local sqlite storage')
+    parser.add_argument('--serve', action='store_true', help='Serve rank queries for the batch over HTTP until interrupted')
+    parser.add_argument('--port', type=int, default=RANK_SERVICE_PORT, help='Port of the rank query service')
+    parser.add_argument('--http-mode', choices=HTTP_MODES, default='live', help='Send requests live, record every response to the archive, or replay them from it offline')
+    parser.add_argument('--http-archive', default=Config.HTTP_ARCHIVE_DIR, help='Directory of the recorded HTTP responses')
+    parser.add_argument('--replay-latency', type=float, default=None, help='Seconds per replayed response (default: the recorded latency)')
+    parser.add_argument('--replay-rate-limited', action='store_true', help='Answer replayed requests over HTTP_REPLAY_RATE_LIMITS with 429s')
 
     args = parser.parse_args()
 
+    Config.STORAGE_BACKEND = args.storage
+    Config.HTTP_MODE = args.http_mode
+    Config.HTTP_ARCHIVE_DIR = args.http_archive
+    Config.HTTP_REPLAY_LATENCY = args.replay_latency
+    Config.HTTP_REPLAY_RATE_LIMITED = args.replay_rate_limited
+
     if args.all_batches:
         for batch_key in DB_MAPPING.keys():
             run_for_batch(batch_key, args)
             clear_directories()  # Clear after each batch
     elif args.batch:
         run_for_batch(args.batch, args)
-    else:
+    elif not args.global_leaderboard:
         parser.print_help()
 
+    if args.global_leaderboard:
+        build_global_leaderboard()
+
 def run_for_batch(batch_key, args):
     batch_config = DB_MAPPING[batch_key]
     Config.DB_NAME = batch_config["DB_NAME"]
@@ -92,6 +116,9 @@ def run_for_batch(batch_key, args):
         print("Uploading data to database...")
         upload_to_db(is_test=LIMIT_TEST, test_participants=participants if participants else None)
 
+    if args.snapshot:
+        take_snapshot()
+
     if args.scrape:
         if args.scrape == 'all':
             scrape_all()
@@ -106,12 +133,15 @@ def run_for_batch(batch_key, args):
         leaderboard_data = leaderboard.build_leaderboard()
 
     if args.evaluate:  # Check if evaluation is requested
-        evaluate_leaderboard()
+        evaluate_leaderboard(mode=args.evaluate_mode)
         print(f'Evaluation completed for {Config.DB_NAME} - {Config.USERS_COLLECTION}')
 
     if args.integrate:
         integrate_with_main_leaderboard()
 
+    if args.serve:
+        RankService().serve(args.port)
+
 def check_required_files():
     required_files = [CODECHEF_FILE, CODEFORCES_FILE, GEEKSFORGEEKS_FILE, HACKERRANK_FILE, LEETCODE_FILE]
     for file in required_files:
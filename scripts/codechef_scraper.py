@@ -1,41 +1,28 @@
-import time
 import json
-import requests
 import pandas as pd
+from concurrent.futures import as_completed
 
-from cmrit_leaderboard.config import CODECHEF_API_URL, CALL_INTERVAL, CODECHEF_CLIENT_ID, CODECHEF_CLIENT_SECRET, DEBUG
+from cmrit_leaderboard.config import CODECHEF_API_URL, DEBUG
+from cmrit_leaderboard.codechef_pool import CodechefTokenPool
+from cmrit_leaderboard.rate_limiter import parse_retry_after
 
-def fetch_codechef_access_token():
-    response = requests.post("https://api.codechef.com/oauth/token",
-                         data={"grant_type": "client_credentials",
-                               "scope": "public",
-                               "client_id": f"{CODECHEF_CLIENT_ID}",
-                               "client_secret": f"{CODECHEF_CLIENT_SECRET}",
-                               "redirect_uri": ""})
-    json_data = response.json()
-
-    access_token = json_data["result"]["data"]["access_token"]
-
-    return access_token
-
-def fetch_codechef_score(username, access_token, depth=0):
+def fetch_codechef_score(username, credential, depth=0):
     try:
-        response = requests.get(f"{CODECHEF_API_URL}/users/{username}",
-                                   headers={f"Authorization": f"Bearer {access_token}"},
+        response = credential.get(f"{CODECHEF_API_URL}/users/{username}",
                                    params={"fields": "ratings"},
                                    timeout=10)
         
         if response.status_code == 200:
-            time.sleep(2)
             return response.json()["result"]["data"]["content"]["ratings"]["allContest"]
         else:
             print(f"Error: {response.status_code} - {response.text}")
             print("Trying again... Attempt: ", depth)
             if ("Unauthorized" in response.text or "cloudflare" in response.text) and depth < 100:
-                return fetch_codechef_score(username, access_token, depth + 1)
+                # CodeChef answers Unauthorized when throttled, back off before trying again
+                credential.limiter.on_throttled(parse_retry_after(response))
+                return fetch_codechef_score(username, credential, depth + 1)
             else:
-                print("Too many recursive calls, exiting")
-                exit(1)
+                raise RuntimeError(f"CodeChef API kept failing for {username}: {response.status_code}")
     except KeyError:
         print("Invalid JSON response from Codechef API")
         print("--" * 30)
@@ -43,57 +30,44 @@ def fetch_codechef_score(username, access_token, depth=0):
         print("--" * 30)
         return None
     except json.decoder.JSONDecodeError:
-        print("Invalid JSON response from Codechef API")
-        exit(1)
+        raise RuntimeError(f"Invalid JSON response from Codechef API for {username}")
 
-def scrape_codechef(users: pd.DataFrame) -> pd.DataFrame:
-    last_request_time = time.time()
-    total = len(users)
-    
-    access_token = fetch_codechef_access_token()
-    token_fetch_time = time.time()  # Track when the token was fetched
+def scrape_codechef(users: pd.DataFrame, checkpoint=None) -> pd.DataFrame:
+    pending = []
 
     for index, user in users.iterrows():
-        print("--" * 10)
         hallTicketNo = user['hallTicketNo']
         codechef_handle = user['codechefUsername']
-        codechef_score = 0
 
-        print(f"\nProcessing participant ({index+1}/{total}): {hallTicketNo} with handle {codechef_handle}")
-
-        if "@" not in codechef_handle and codechef_handle != '':
-            if codechef_handle != '#n/a':
-                current_time = time.time()
-                time_since_last_request = current_time - last_request_time
-
-                # Check if the token needs to be refreshed
-                if current_time - token_fetch_time >= 3000:  # Token validity check (1 hour)
-                    print("Access token expired. Fetching a new token...")
-                    access_token = fetch_codechef_access_token()
-                    token_fetch_time = time.time()  # Update the token fetch time
-                
-                print("Time since last token refresh:", time_since_last_request)
-                print("Time left to create new token:", 3000 - (current_time - token_fetch_time))
+        # Already scraped by an earlier, interrupted run
+        stored = checkpoint.get(hallTicketNo) if checkpoint else None
+        if stored is not None:
+            users.loc[index, 'codechefRating'] = stored['codechefRating']
+        elif "@" not in codechef_handle and codechef_handle != '' and codechef_handle != '#n/a':
+            pending.append(index)
+        else:
+            users.loc[index, 'codechefRating'] = 0
+            if checkpoint:
+                checkpoint.save(hallTicketNo, {'codechefRating': 0})
 
-                if time_since_last_request < CALL_INTERVAL:
-                    wait_time = CALL_INTERVAL - time_since_last_request
-                    print(f"Rate limit in effect. Waiting for {wait_time:.2f} seconds.")
-                    time.sleep(wait_time)
-                
-                # Update the last request time
-                last_request_time = time.time()
+    # Every credential fetches its share of the participants, paced by its own rate limiter
+    with CodechefTokenPool() as pool:
+        futures = {pool.submit(fetch_codechef_score, users.loc[index, 'codechefUsername']): index for index in pending}
 
-                # Get CodeChef score
-                codechef_score = fetch_codechef_score(codechef_handle, access_token)
+        for done, future in enumerate(as_completed(futures), start=1):
+            index = futures[future]
+            hallTicketNo = users.loc[index, 'hallTicketNo']
+            codechef_score = future.result()
 
-                if codechef_score is None:
-                    codechef_score = 0
+            if codechef_score is None:
+                codechef_score = 0
 
-        # Update the DataFrame
-        users.loc[index, 'codechefRating'] = codechef_score
+            # Update the DataFrame
+            users.loc[index, 'codechefRating'] = codechef_score
+            if checkpoint:
+                checkpoint.save(hallTicketNo, {'codechefRating': codechef_score})
 
-        # Print progress
-        print(f"Processed participant {index+1}/{len(users)}")
-        print("--" * 10)
+            # Print progress
+            print(f"Processed participant ({done}/{len(pending)}): {hallTicketNo} with handle {users.loc[index, 'codechefUsername']}, rating {codechef_score}")
 
     return users
@@ -6,12 +6,15 @@ import requests
 import pandas as pd
 
 from cmrit_leaderboard.config import CODEFORCES_URL, API_KEY, API_SECRET, CODEFORCES_FILE, DEBUG
+from cmrit_leaderboard.http_client import get_http_client
 from verifiers.utils import generate_random_string, generate_api_sig
+from scripts.handle_matcher import HandleMatcher
 
 def fetch_codeforces_scores(handles):
     random_string = generate_random_string(6)
     current_time = int(time.time())
-    handles_string = ';'.join([handle for handle in handles if handle != '#n/a'])
+    # Sorted, so the same handles always produce the same request (see http_archive)
+    handles_string = ';'.join(sorted(handle for handle in handles if handle != '#n/a'))
     api_sig = generate_api_sig(random_string, "user.info", handles_string, current_time, API_SECRET, API_KEY)
     # Construct the request URL
     url = f"{CODEFORCES_URL}/user.info?handles={handles_string}&apiKey={API_KEY}&time={current_time}&apiSig={random_string}{api_sig}"
@@ -20,9 +23,8 @@ def fetch_codeforces_scores(handles):
         print(f"Url: {url}")
 
     try:
-        response = requests.get(url)
+        response = get_http_client('codeforces').get(url)
         json_response = response.json()
-        time.sleep(10)
         return json_response
     except requests.RequestException as e:
         print(f"Error fetching Codeforces data: {e}")
@@ -38,19 +40,13 @@ def scrape_codeforces(users: pd.DataFrame) -> pd.DataFrame:
     # Load Codeforces handles from users df
     handles = {user["codeforcesUsername"] for index, user in users.iterrows() if user["codeforcesUsername"] != '#n/a' and "@" not in user["codeforcesUsername"]}
     
-    # Create a list of sets of handles with max 300 elements in each set by popping elements from the handles
-    batches = []
-    temp_handles = set()
-    while handles:
-        temp_handles.add(handles.pop())
-        if len(temp_handles) == 400:
-            batches.append(temp_handles)
-            temp_handles = set()
-    if temp_handles:
-        batches.append(temp_handles)
+    # Split the handles, sorted for stable batches, into sets of at most 400
+    handles = sorted(handles)
+    batches = [set(handles[start:start + 400]) for start in range(0, len(handles), 400)]
+    matcher = HandleMatcher(users, 'codeforcesUsername')
 
+    # Pacing between batches is left to the codeforces rate limiter
     for index, batch in enumerate(batches):
-        time.sleep(5)
         current_batch_message = f"""
         =================================
         Processing batch {index + 1} of {len(batches)}
@@ -76,7 +72,7 @@ def scrape_codeforces(users: pd.DataFrame) -> pd.DataFrame:
                     except json.decoder.JSONDecodeError:
                         print(f"JSON error: {user['handle']}")
 
-                    users.loc[users["codeforcesUsername"] == user["handle"].lower(), "codeforcesRating"] = rating
+                    matcher.set(user["handle"], rating)
 
                 break
             else:
@@ -85,6 +81,6 @@ def scrape_codeforces(users: pd.DataFrame) -> pd.DataFrame:
 
     print("Codeforces processing completed")
 
-    return users
+    return matcher.write("codeforcesRating")
 
 
@@ -1,125 +1,149 @@
 # scripts/geeksforgeeks_scraper.py
 
-import json
-import requests
 import pandas as pd
-from selenium import webdriver
-from selenium.webdriver.firefox.service import Service
-from selenium.webdriver.firefox.options import Options
-from selenium.webdriver.common.by import By
-from selenium.webdriver.common.keys import Keys
-from selenium.webdriver.remote.webelement import WebElement
-from selenium.common.exceptions import NoSuchElementException
-from cmrit_leaderboard.config import GFG_WEEKLY_CONTEST_URL, GFG_PRACTICE_URL, GFG_API_URL, GEEKSFORGEEKS_URL, GFG_USERNAME, GFG_PASSWORD, DEBUG
-import time
+from cmrit_leaderboard.config import GFG_WEEKLY_CONTEST_URL, GFG_PRACTICE_URL, GFG_PRACTICE_MAX_PAGES, GFG_API_URL
+from cmrit_leaderboard.http_client import get_http_client
+from scripts.handle_matcher import HandleMatcher, normalize_handle
 
 def scrape_geeksforgeeks_weekly_contest(users: pd.DataFrame) -> pd.DataFrame:
     # Create geeksforgeeksWeeklyRating column
     users['geeksforgeeksWeeklyRating'] = 0
+    matcher = HandleMatcher(users, 'geeksforgeeksUsername')
     for _ in range(10000):
         print(f"Scraping GFG weekly contest page ${_}...")
         url = GFG_WEEKLY_CONTEST_URL + str(_)
         # Get json response
-        response = requests.get(url)
+        response = get_http_client('geeksforgeeks').get(url)
 
         if response.status_code == 200:
             json_response = response.json()
         else:
-            print(f"Error: {response.status_code}")
-            exit(0)
+            raise RuntimeError(f"GFG weekly contest page {_} returned {response.status_code}")
 
         if json_response['results'] == []:
             break
         
         found_zero = False
 
-        geeksforgeeks_user_set = set()
-        # load users geeksforgeeks usernames into set
-        for user in users['geeksforgeeksUsername']:
-            geeksforgeeks_user_set.add(user.lower())
-
         for gfg_user in json_response['results']:
-            gfg_response_username = str(gfg_user['user_handle']).lower()
-
-            if gfg_response_username in geeksforgeeks_user_set:
-                users.loc[users['geeksforgeeksUsername'] == str(gfg_user['user_handle']).lower(), 'geeksforgeeksWeeklyRating'] = int(gfg_user['user_score'])
-                print(f"Found user {gfg_user['user_handle'].lower()} with rating {gfg_user['user_score']}")
+            if matcher.set(gfg_user['user_handle'], int(gfg_user['user_score'] or 0)):
+                print(f"Found user {str(gfg_user['user_handle']).lower()} with rating {gfg_user['user_score']}")
             if gfg_user['user_score'] == 0 or gfg_user['user_score'] == None:
                 found_zero = True
 
         if found_zero:
             break
 
-    return users
+    return matcher.write('geeksforgeeksWeeklyRating')
+
+def fetch_practice_listing():
+    """
+    Coding scores of every student in the institute stats listing, by normalized handle.
+
+    The endpoint pages its students like the other practice APIs:
+    {"count": ..., "next": <url or null>, "previous": ..., "results": [{"handle": ..., "coding_score": ...}, ...]}
+    Pages are read until `next` is null, `count` students are in, a page repeats the
+    previous one or GFG_PRACTICE_MAX_PAGES is reached. A bad response ends the listing
+    early, the students it misses are looked up one by one.
+    """
+    scores = {}
+    previous_handles = None
+    for page in range(1, GFG_PRACTICE_MAX_PAGES + 1):
+        response = get_http_client('geeksforgeeks').get(GFG_PRACTICE_URL + str(page))
+        if response.status_code != 200:
+            print(f"Error fetching GFG institute stats page {page}: {response.status_code}")
+            break
+        try:
+            content = response.json()
+            results = content['results']
+            handles = [normalize_handle(entry['handle']) for entry in results]
+        except (ValueError, KeyError, TypeError) as e:
+            print(f"Unexpected GFG institute stats page {page}: {e.__class__.__name__} - {e}")
+            break
+
+        if not results:
+            break
+        # The page parameter was ignored, the rest would be more of the same
+        if handles == previous_handles:
+            print(f"GFG institute stats page {page} repeats page {page - 1}, stopping")
+            break
+        previous_handles = handles
+
+        for handle, entry in zip(handles, results):
+            scores[handle] = entry.get('coding_score') or 0
+        print(f"GFG institute stats page {page}: {len(results)} students")
+
+        if not content.get('next') or len(scores) >= content.get('count', float('inf')):
+            break
+    else:
+        print(f"Stopped the GFG institute stats after {GFG_PRACTICE_MAX_PAGES} pages")
+
+    return scores
+
+def fetch_practice_score(gfg_handle):
+    """Coding score from a student's profile, for students missing from the institute listing."""
+    response = get_http_client('geeksforgeeks').get(f"{GFG_API_URL}{gfg_handle}")
+    try:
+        json_content = response.json()
+    except ValueError as e:
+        raise RuntimeError(f"Error parsing JSON response for GFG handle {gfg_handle}: {e}")
 
-def scrape_geeksforgeeks_practice(users: pd.DataFrame) -> pd.DataFrame:
+    try:
+        gfg_rating = json_content['data']['score']
+    except Exception as e:
+        print(f"Error fetching practice rating for {gfg_handle}: {e.__class__.__name__} - {e}")
+        gfg_rating = 0
+
+    return gfg_rating or 0
+
+def scrape_geeksforgeeks_practice(users: pd.DataFrame, checkpoint=None) -> pd.DataFrame:
     # Create geeksforgeeksPracticeRating column
     users['geeksforgeeksPracticeRating'] = 0
     print("GFG practice scraping in progress...")
-    
-    # Initialize Firefox driver
-    options = Options()
-    options.add_argument("-headless")
-    driver = webdriver.Firefox(options=options)
-    
-    # Log in to GeeksforGeeks
-    print("Logging in to GeeksforGeeks...")
-    driver.get("https://auth.geeksforgeeks.org/")
-    try:
-        username = driver.find_element(By.ID, "luser")
-        password = driver.find_element(By.ID, "password")
-        username.send_keys(GFG_USERNAME)
-        password.send_keys(GFG_PASSWORD)
-        driver.find_element(By.CLASS_NAME, "signin-button").click()
-        print("Login successful.")
-        time.sleep(5)  # Wait for the login process
-    except Exception as e:
-        print(f"Login error: {e}")
-        driver.quit()
-        return users
 
-    # Scrape individual user profiles if practice rating is not available
+    # Most students are in the institute listing, fetched in a few bulk pages
+    listing = fetch_practice_listing()
+    print(f"GFG institute stats list {len(listing)} students")
+    looked_up = 0
+
     for index, user in users.iterrows():
-        if not pd.isna(user['geeksforgeeksPracticeRating']):
-            gfg_handle = user['geeksforgeeksUsername']
-            driver.get(f"view-source:{GFG_API_URL}{gfg_handle}")
-            time.sleep(0.1)
-            
-            try:
-                # Parse JSON response
-                try:
-                    json_element = driver.find_element(By.TAG_NAME, "pre")
-                    json_content = json.loads(json_element.text)
-                except Exception as e:
-                    raise RuntimeError(f"Error parsing JSON response for {user['hallTicketNo']} with LeetCode handle {gfg_handle}: {e}")
-                
-                try:
-                    gfg_rating = json_content['data']['score']
-                except Exception as e:
-                    print(f"Error fetching practice rating for {gfg_handle}: {e.__class__.__name__} - {e}")
-                    gfg_rating = 0
-
-                if gfg_rating is None:
-                    gfg_rating = 0
-
-                users.at[index, 'geeksforgeeksPracticeRating'] = gfg_rating
-                
-                print(f"{index+1}/{len(users)} - Found practice rating for {user['hallTicketNo']} with GFG handle {gfg_handle}: {gfg_rating}")
-
-            except (NoSuchElementException, ValueError) as e:
-                print(f"Error fetching practice rating for {gfg_handle}: {e}")
-
-    # Close the browser
-    driver.quit()
-    print("GFG practice scraping completed.")
-    
+        # Already scraped by an earlier, interrupted run
+        stored = checkpoint.get(user['hallTicketNo']) if checkpoint else None
+        if stored is not None:
+            users.at[index, 'geeksforgeeksPracticeRating'] = stored['geeksforgeeksPracticeRating']
+            continue
+
+        gfg_handle = user['geeksforgeeksUsername']
+        if normalize_handle(gfg_handle) in listing:
+            gfg_rating = listing[normalize_handle(gfg_handle)]
+        else:
+            # Not in the listing, ask the profile API, paced by the geeksforgeeks rate limiter
+            gfg_rating = fetch_practice_score(gfg_handle)
+            looked_up += 1
+            print(f"{index+1}/{len(users)} - Looked up practice rating for {user['hallTicketNo']} with GFG handle {gfg_handle}: {gfg_rating}")
+
+        users.at[index, 'geeksforgeeksPracticeRating'] = gfg_rating
+        if checkpoint:
+            checkpoint.save(user['hallTicketNo'], {'geeksforgeeksPracticeRating': gfg_rating})
+
+    print(f"GFG practice scraping completed, {looked_up} students looked up one by one.")
+
     return users
 
-def scrape_geeksforgeeks(users: pd.DataFrame) -> pd.DataFrame:
-    users = scrape_geeksforgeeks_practice(users)  
-    users = scrape_geeksforgeeks_weekly_contest(users)
+def scrape_geeksforgeeks(users: pd.DataFrame, checkpoint=None) -> pd.DataFrame:
+    users = scrape_geeksforgeeks_practice(users, checkpoint)
+    stored_weekly = users['geeksforgeeksWeeklyRating'].copy() if 'geeksforgeeksWeeklyRating' in users.columns else None
+    try:
+        users = scrape_geeksforgeeks_weekly_contest(users)
+    except RuntimeError as e:
+        # Keep the practice results, the weekly ratings stay as they are in the database
+        print(f"GFG weekly contest scraping failed, keeping the stored weekly ratings: {e}")
+        if stored_weekly is None:
+            users = users.drop(columns=['geeksforgeeksWeeklyRating'])
+        else:
+            users['geeksforgeeksWeeklyRating'] = stored_weekly
 
     print("GFG scraping completed.")
-    print(users[['hallTicketNo', 'geeksforgeeksUsername', 'geeksforgeeksWeeklyRating', 'geeksforgeeksPracticeRating']])
+    print(users[users.columns[users.columns.isin(['hallTicketNo', 'geeksforgeeksUsername', 'geeksforgeeksWeeklyRating', 'geeksforgeeksPracticeRating'])]])
 
     return users
\ No newline at end of file
@@ -1,53 +1,95 @@
 # scripts/hackerrank_scraper.py
 
-import urllib.parse
-import json
+import asyncio
 import requests
-from cmrit_leaderboard.config import Config, HACKERRANK_URL, HACKERRANK_CONTEST_URLS, HACKERRANK_API_URL
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+from cmrit_leaderboard.config import Config, HACKERRANK_CONTEST_URLS, HACKERRANK_API_URL, HACKERRANK_PAGE_SIZE, HACKERRANK_MAX_CONCURRENT_REQUESTS, HACKERRANK_PAGE_RETRIES
+from cmrit_leaderboard.http_client import get_http_client
+from scripts.handle_matcher import HandleMatcher
 
 def scrape_hackerrank(users):
-    # Create hackerrankRating column
-    users['hackerrankRating'] = 0
     # Load the contest name from urls and store in a list
-    SEARCH_TOKENS = [url.split('/')[-1] for url in HACKERRANK_CONTEST_URLS[Config.USERS_COLLECTION]]
-
-    for token in SEARCH_TOKENS:
-        for i in range(1, 10000, 100):
-            # String url = "https://www.hackerrank.com/rest/contests/" + trackerName + "/leaderboard?offset=" + j + "&limit=100";                url = f"{HACKERRANK_API_URL
-            url = f"{HACKERRANK_API_URL}/{token}/leaderboard?offset={i}&limit=100"
-            header = {
-                "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/121.0.0.0 Safari/537.36",
-                "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,image/apng,*/*;q=0.8",
-                "Accept-Language": "en-US,en;q=0.9",
-                "Accept-Encoding": "gzip, deflate, br",
-                "Connection": "keep-alive",
-                "Upgrade-Insecure-Requests": "1",
-                "TE": "Trailers"
-            }
+    contests = [url.split('/')[-1] for url in HACKERRANK_CONTEST_URLS[Config.USERS_COLLECTION]]
+    matcher = HandleMatcher(users, 'hackerrankUsername')
 
-            print(url)
+    asyncio.run(fetch_contest_scores(contests, matcher))
 
-            response = requests.get(url, headers=header)
+    # Sum of scores across all contests, 0 for users not on any leaderboard
+    users['hackerrankRating'] = 0
+    users = matcher.write('hackerrankRating')
 
-            response_json = response.json()
+    print(users[['hallTicketNo', 'hackerrankUsername', 'hackerrankRating']])
 
-            if response_json['models'] == []:
-                break
+    return users
 
-            hackerrank_users_set = set()
+async def fetch_contest_scores(contests, matcher):
+    """
+    Fetch the leaderboards of all contests concurrently, adding every score to the matcher.
 
-            for user in users['hackerrankUsername']:
-                hackerrank_users_set.add(user.lower())
+    The first page of a contest tells how many entries it has, the remaining pages are
+    then requested together. Requests to a host are capped at HACKERRANK_MAX_CONCURRENT_REQUESTS.
+    A page that keeps failing is skipped, the rest of its contest still counts.
+    """
+    semaphores = {}
+    # Enough threads for every request the semaphores let through
+    asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(HACKERRANK_MAX_CONCURRENT_REQUESTS))
+    client = get_http_client('hackerrank')
+    await asyncio.gather(*(fetch_contest(client, semaphores, contest, matcher) for contest in contests))
 
-            for hackerrank_user in response_json['models']:
-                hackerrank_username = hackerrank_user['hacker'].lower()
-                if hackerrank_username in hackerrank_users_set:
-                    users.loc[users['hackerrankUsername'] == hackerrank_username, 'hackerrankRating'] += hackerrank_user['score']
-                print(f"Found user {hackerrank_user['hacker']} with rating {hackerrank_user['score']}")
+async def fetch_contest(client, semaphores, contest, matcher):
+    first_page = await fetch_page(client, semaphores, contest, 0)
+    if first_page is None:
+        print(f"Skipping {contest} leaderboard, its first page could not be fetched")
+        return
+    fold_scores(first_page, matcher)
+    pages = 1
+    skipped = 0
 
-            print(f"Done with {token} leaderboard offset {i} - {i+100}")
+    total = first_page.get('total')
+    if total is None:
+        # No total in the response, walk the pages until an empty one
+        offset = HACKERRANK_PAGE_SIZE
+        page = first_page
+        while page['models']:
+            page = await fetch_page(client, semaphores, contest, offset)
+            if page is None:
+                # Without a total there is no telling how many pages are left
+                skipped += 1
+                break
+            if page['models']:
+                fold_scores(page, matcher)
+                pages += 1
+            offset += HACKERRANK_PAGE_SIZE
+    else:
+        requests_left = [fetch_page(client, semaphores, contest, offset) for offset in range(HACKERRANK_PAGE_SIZE, total, HACKERRANK_PAGE_SIZE)]
+        # Fold each page in as soon as it arrives
+        for request in asyncio.as_completed(requests_left):
+            page = await request
+            if page is None:
+                skipped += 1
+                continue
+            fold_scores(page, matcher)
+            pages += 1
 
-    print(users[['hallTicketNo', 'hackerrankUsername', 'hackerrankRating']])
+    print(f"Done with {contest} leaderboard: {pages} pages, {skipped} skipped")
 
-    return users
+async def fetch_page(client, semaphores, contest, offset):
+    """A leaderboard page, or None when it still fails after HACKERRANK_PAGE_RETRIES retries."""
+    url = f"{HACKERRANK_API_URL}/{contest}/leaderboard?offset={offset}&limit={HACKERRANK_PAGE_SIZE}"
+    # Created on the event loop thread, so no lock is needed
+    semaphore = semaphores.setdefault(urlparse(url).netloc, asyncio.Semaphore(HACKERRANK_MAX_CONCURRENT_REQUESTS))
+    for attempt in range(HACKERRANK_PAGE_RETRIES + 1):
+        try:
+            async with semaphore:
+                # requests is blocking, the call runs on the loop's executor
+                response = await asyncio.to_thread(client.get, url)
+            response.raise_for_status()
+            return response.json()
+        except (requests.RequestException, ValueError) as e:
+            print(f"Error fetching {contest} leaderboard at offset {offset}, attempt {attempt + 1}: {e}")
+    return None
 
+def fold_scores(page, matcher):
+    for hackerrank_user in page['models']:
+        matcher.add(hackerrank_user['hacker'], hackerrank_user['score'])
@@ -0,0 +1,46 @@
+# scripts/handle_matcher.py
+
+import pandas as pd
+
+def normalize_handle(handle):
+    return str(handle).strip().lower()
+
+class HandleMatcher:
+    """
+    Matches handles found on a platform's leaderboard to rows of the users frame.
+
+    Built once per scrape, it maps every normalized handle to the row positions holding it,
+    so each leaderboard entry is a dict lookup. Scores are kept in a dict while scanning
+    and written back into the frame with a single column assignment by `write`.
+    """
+    def __init__(self, users: pd.DataFrame, column):
+        self.users = users
+        self.positions = {}
+        for position, handle in enumerate(users[column]):
+            self.positions.setdefault(normalize_handle(handle), []).append(position)
+        self.scores = {}
+
+    def set(self, handle, score):
+        """Record the score of a handle, return whether it belongs to any user."""
+        handle = normalize_handle(handle)
+        if handle not in self.positions:
+            return False
+        self.scores[handle] = score
+        return True
+
+    def add(self, handle, score):
+        """Add to the score of a handle, return whether it belongs to any user."""
+        handle = normalize_handle(handle)
+        if handle not in self.positions:
+            return False
+        self.scores[handle] = self.scores.get(handle, 0) + score
+        return True
+
+    def write(self, column, default=0):
+        """Store the recorded scores in `column`, other rows keep their value or get `default`."""
+        values = self.users[column].tolist() if column in self.users.columns else [default] * len(self.users)
+        for handle, score in self.scores.items():
+            for position in self.positions[handle]:
+                values[position] = score
+        self.users[column] = values
+        return self.users
@@ -153,7 +153,7 @@ def integrate_with_main_leaderboard():
 Integrate pyramid contest data with the main leaderboard.
 This function is called from the main script after scraping all platforms.
     """
-    from cmrit_leaderboard.database import Database
+    from cmrit_leaderboard.database import get_database
 
     for collection, paths in PYRAMID_CONTESTS_PATHS.items():
         output_dir = os.path.dirname(os.path.dirname(paths[0]))
@@ -169,7 +169,7 @@ This function is called from the main script after scraping all platforms.
         pyramid_df = pd.read_csv(leaderboard_file)
 
         # Connect to database
-        db = Database()
+        db = get_database()
 
         # Fetch existing users
         users = db.get_all_users(collection)
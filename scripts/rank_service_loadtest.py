@@ -0,0 +1,90 @@
+# scripts/rank_service_loadtest.py
+
+# Usage: python -m scripts.rank_service_loadtest --url http://localhost:8080 --requests 20000 --concurrency 16
+# Start the service first with: python main.py --batch <batch> --serve
+
+import json
+import time
+import random
+import argparse
+import statistics
+import http.client
+from urllib.parse import urlparse, quote
+from concurrent.futures import ThreadPoolExecutor
+
+def sample_students(host, port, count=200):
+    connection = http.client.HTTPConnection(host, port)
+    connection.request('GET', f'/page?page=1&size={count}')
+    records = json.loads(connection.getresponse().read())
+    connection.close()
+    return [record['hallTicketNo'] for record in records]
+
+def make_paths(students, count):
+    # Mix of the queries the website sends, mostly individual lookups
+    paths = []
+    for _ in range(count):
+        student = quote(str(random.choice(students)))
+        kind = random.random()
+        if kind < 0.4:
+            paths.append(f'/rank?student={student}')
+        elif kind < 0.7:
+            paths.append(f'/neighbourhood?student={student}&radius=5')
+        elif kind < 0.9:
+            paths.append(f'/page?page={random.randint(1, 10)}&size=100')
+        else:
+            paths.append('/top?n=50')
+    return paths
+
+def run_worker(host, port, paths):
+    # One keep-alive connection per worker
+    connection = http.client.HTTPConnection(host, port)
+    latencies = []
+    errors = 0
+    for path in paths:
+        started = time.perf_counter()
+        connection.request('GET', path)
+        response = connection.getresponse()
+        response.read()
+        latencies.append(time.perf_counter() - started)
+        if response.status != 200:
+            errors += 1
+    connection.close()
+    return latencies, errors
+
+def percentile(sorted_values, fraction):
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+def main():
+    parser = argparse.ArgumentParser(description='Load test the rank query service')
+    parser.add_argument('--url', default='http://localhost:8080', help='Base URL of the service')
+    parser.add_argument('--requests', type=int, default=10000, help='Total number of requests')
+    parser.add_argument('--concurrency', type=int, default=8, help='Number of concurrent connections')
+    args = parser.parse_args()
+
+    url = urlparse(args.url)
+    students = sample_students(url.hostname, url.port or 80)
+    if not students:
+        print("The service has no users loaded")
+        return
+
+    paths = make_paths(students, args.requests)
+    batches = [paths[i::args.concurrency] for i in range(args.concurrency)]
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        results = list(executor.map(lambda batch: run_worker(url.hostname, url.port or 80, batch), batches))
+    elapsed = time.perf_counter() - started
+
+    latencies = sorted(latency for batch_latencies, _ in results for latency in batch_latencies)
+    errors = sum(batch_errors for _, batch_errors in results)
+
+    print(f"{len(latencies)} requests over {args.concurrency} connections in {elapsed:.2f}s: "
+          f"{len(latencies) / elapsed:.0f} req/s, {errors} non-200 responses")
+    print(f"Latency ms - mean: {statistics.mean(latencies) * 1000:.2f}, "
+          f"p50: {percentile(latencies, 0.50) * 1000:.2f}, "
+          f"p95: {percentile(latencies, 0.95) * 1000:.2f}, "
+          f"p99: {percentile(latencies, 0.99) * 1000:.2f}, "
+          f"max: {latencies[-1] * 1000:.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,7 @@
+# tests/conftest.py
+
+import os
+import sys
+
+# Import cmrit_leaderboard from the repository root however pytest is started
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
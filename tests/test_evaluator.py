@@ -0,0 +1,76 @@
+# tests/test_evaluator.py
+#
+# Parity between the two evaluation paths: the aggregation pipeline of
+# evaluate_leaderboard(mode='aggregate') and score_ratings in pandas must give the same scores.
+# Runs against mongomock by default. Set MONGODB_TEST_URI to also run the full $merge
+# path against a real server (a throwaway database is created and dropped).
+
+import os
+import uuid
+
+import mongomock
+import numpy as np
+import pandas as pd
+import pytest
+from pymongo import MongoClient
+
+import cmrit_leaderboard.database as database
+from cmrit_leaderboard.config import Config
+from cmrit_leaderboard.evaluator import PERCENTILE_WEIGHTS, build_evaluation_pipeline, evaluate_leaderboard_in_database, get_rating_maxima, rating_matrix, score_ratings
+
+MONGODB_TEST_URI = os.getenv('MONGODB_TEST_URI')
+
+# Integer and fractional ratings, missing fields and nulls, the cases fillna(0) covers
+USERS = [
+    {'hallTicketNo': '1CR21CS001', 'codechefRating': 1612, 'codeforcesRating': 1432.5, 'leetcodeRating': 1820.37, 'hackerrankRating': 905},
+    {'hallTicketNo': '1CR21CS002', 'codechefRating': 1405, 'geeksforgeeksWeeklyRating': 312, 'geeksforgeeksPracticeRating': 1046, 'pyramidWeeklyRating': 7},
+    {'hallTicketNo': '1CR21IS003', 'codeforcesRating': None, 'leetcodeRating': 1503.123456789, 'pyramidMonthlyRating': 12.5},
+    {'hallTicketNo': '1CR21IS004'},
+    {'hallTicketNo': '1CR21EC005', 'codechefRating': 0, 'codeforcesRating': 977, 'geeksforgeeksWeeklyRating': 0.1, 'hackerrankRating': 1e-9},
+]
+
+@pytest.fixture
+def db(monkeypatch):
+    """A Database on a fresh collection, backed by mongomock or MONGODB_TEST_URI."""
+    client = MongoClient(MONGODB_TEST_URI) if MONGODB_TEST_URI else mongomock.MongoClient()
+    name = f'evaluator-test-{uuid.uuid4().hex[:8]}'
+    monkeypatch.setattr(database, 'get_client', lambda: client)
+    monkeypatch.setattr(Config, 'DB_NAME', name)
+    monkeypatch.setattr(Config, 'USERS_COLLECTION', 'USERS')
+
+    db = database.Database()
+    db.users_collection.insert_many([dict(user) for user in USERS])
+    yield db
+    client.drop_database(name)
+
+def pandas_scores(db):
+    users = pd.DataFrame(db.get_all_users(fields=['hallTicketNo'] + list(PERCENTILE_WEIGHTS)))
+    ratings = rating_matrix(users)
+    maxima = dict(zip(PERCENTILE_WEIGHTS, ratings.max(axis=0).tolist()))
+    total_rating, percentile = score_ratings(ratings, maxima)
+    return maxima, dict(zip(users['hallTicketNo'], zip(total_rating.tolist(), percentile.tolist())))
+
+def test_maxima_match(db):
+    maxima, _ = pandas_scores(db)
+    assert get_rating_maxima(db) == maxima
+
+def test_pipeline_scores_match_pandas(db):
+    maxima, expected = pandas_scores(db)
+
+    # Everything but the $merge stage, which mongomock does not implement
+    pipeline = build_evaluation_pipeline(maxima, Config.USERS_COLLECTION, pd.Timestamp.now())[:-1]
+    pipeline[0]['$project']['hallTicketNo'] = 1
+    scores = {user['hallTicketNo']: (user['TotalRating'], user['Percentile']) for user in db.aggregate(pipeline)}
+
+    # Bit-for-bit, not approximately
+    assert scores == expected
+
+@pytest.mark.skipif(not MONGODB_TEST_URI, reason='$merge needs a real MongoDB, set MONGODB_TEST_URI')
+def test_aggregate_mode_matches_pandas(db):
+    _, expected = pandas_scores(db)
+
+    evaluate_leaderboard_in_database(db, pd.Timestamp.now())
+
+    scores = {user['hallTicketNo']: (user['TotalRating'], user['Percentile']) for user in db.get_all_users(fields=['hallTicketNo', 'TotalRating', 'Percentile'])}
+    assert scores == expected
+    assert not np.isnan([value for score in scores.values() for value in score]).any()
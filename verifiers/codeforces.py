@@ -5,13 +5,15 @@ import requests
 import time
 import re
 from cmrit_leaderboard.config import CODEFORCES_URL, API_KEY, API_SECRET, CODEFORCES_FILE, DEBUG
+from cmrit_leaderboard.http_client import get_http_client
 from .utils import generate_random_string, generate_api_sig
 
 
 def check_codeforces_users(handles):
     random_string = generate_random_string(6)
     current_time = int(time.time())
-    handles_string = ';'.join([handle for handle in handles if handle != '#n/a'])
+    # Sorted, so the same handles always produce the same request (see http_archive)
+    handles_string = ';'.join(sorted(handle for handle in handles if handle != '#n/a'))
     api_sig = generate_api_sig(random_string, "user.info", handles_string, current_time, API_SECRET, API_KEY)
     # Construct the request URL
     url = f"{CODEFORCES_URL}/user.info?handles={handles_string}&apiKey={API_KEY}&time={current_time}&apiSig={random_string}{api_sig}"
@@ -19,7 +21,7 @@ def check_codeforces_users(handles):
     if DEBUG:
         print(f"Url: {url}")
     try:
-        response = requests.get(url)
+        response = get_http_client('codeforces').get(url)
         json_response = response.json()
 
         return json_response
@@ -28,8 +30,8 @@ def check_codeforces_users(handles):
         print(url)
         print(response.text)
         # Try again, if response is still invalid raise exception
-        time.sleep(5)
-        response = requests.get(url)
+        # The codeforces rate limiter spaces the retry out
+        response = get_http_client('codeforces').get(url)
         json_response = response.json()
 
         if json_response["status"] == "OK":
@@ -47,16 +49,9 @@ def process_codeforces(participants):
     final_valid_handles = set()
     final_invalid_handles = set()
 
-    # Create a list of sets of handles with max 300 elements in each set by popping elements from the handles
-    batches = []
-    temp_handles = set()
-    while handles:
-        temp_handles.add(handles.pop())
-        if len(temp_handles) == 450:
-            batches.append(temp_handles)
-            temp_handles = set()
-    if temp_handles:
-        batches.append(temp_handles)
+    # Split the handles, sorted for stable batches, into sets of at most 450
+    handles = sorted(handles)
+    batches = [set(handles[start:start + 450]) for start in range(0, len(handles), 450)]
 
     for index, batch in enumerate(batches):
         current_batch_message = f"""
@@ -98,5 +93,6 @@ def process_codeforces(participants):
                 else:
                     f.write(f"{participant.handle}, {participant.codeforces_handle}, {False}\n")
 
+    get_http_client('codeforces').print_stats()
     print(f"Total valid handles: {len(final_valid_handles)}")
     print(f"Total invalid handles: {len(final_invalid_handles)}")
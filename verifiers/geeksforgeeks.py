@@ -2,18 +2,10 @@
 
 import requests
 from cmrit_leaderboard.config import GEEKSFORGEEKS_FILE, GFG_API_URL, DEBUG
+from cmrit_leaderboard.http_client import get_http_client
 
 def check_geekforgeeks_url(url):
-    header = {
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/121.0.0.0 Safari/537.36",
-        "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,image/apng,*/*;q=0.8",
-        "Accept-Language": "en-US,en;q=0.9",
-        "Accept-Encoding": "gzip, deflate, br",
-        "Connection": "keep-alive",
-        "Upgrade-Insecure-Requests": "1",
-        "TE": "Trailers"
-    }
-    response = requests.get(url, headers=header)
+    response = get_http_client('geeksforgeeks').get(url)
     try:
         if response.status_code == 200:
             # Check if the final URL is the same as the original URL (no redirect), if redirected, then URL does not
@@ -31,7 +23,7 @@ def check_geekforgeeks_url(url):
         return False, "Exception"
     
 def check_geekforgeeks_url_api(url):
-    response = requests.get(url)
+    response = get_http_client('geeksforgeeks').get(url)
     response_json = response.json()
     if response.status_code == 200:
         try:
@@ -78,3 +70,5 @@ def process_geeksforgeeks(participants):
 
         print(f"{i}/{total}: {participant.handle} with handle {participant.geeksforgeeks_handle} result: {geeksforgeeks_url_exists}")
 
+    get_http_client('geeksforgeeks').print_stats()
+
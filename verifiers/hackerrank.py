@@ -3,20 +3,12 @@
 import requests
 from bs4 import BeautifulSoup
 from cmrit_leaderboard.config import HACKERRANK_URL, HACKERRANK_FILE, DEBUG
+from cmrit_leaderboard.http_client import get_http_client
 from time import sleep
 
 def check_url_exists(url):
-    header = {
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/121.0.0.0 Safari/537.36",
-        "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,image/apng,*/*;q=0.8",
-        "Accept-Language": "en-US,en;q=0.9",
-        "Accept-Encoding": "gzip, deflate, br",
-        "Connection": "keep-alive",
-        "Upgrade-Insecure-Requests": "1",
-        "TE": "Trailers"
-    }
     try:
-        response = requests.get(url, headers=header)
+        response = get_http_client('hackerrank').get(url)
         soup = BeautifulSoup(response.text, 'html.parser')
 
         # try to find community-content class within the soup, if found then the handle exists
@@ -58,3 +50,5 @@ def process_hackerrank(participants):
             print(f"{index}/{len(participants)} - Respoded with a URL: {response_url}, URL exists: {url_exists}")
         with open(HACKERRANK_FILE, 'a') as file:
             file.write(f"{participant.handle}, {participant.hackerrank_handle}, {url_exists}\n")
+
+    get_http_client('hackerrank').print_stats()